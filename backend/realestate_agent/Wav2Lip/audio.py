@@ -1,13 +1,192 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 import librosa
 import librosa.filters
 import numpy as np
 # import tensorflow as tf
+from math import gcd
 from scipy import signal
 from scipy.io import wavfile
 from hparams import hparams as hp
 
+try:
+    import soundfile
+except ImportError:  # Falls back to scipy (PCM wav) or librosa below
+    soundfile = None
+
+def _read_audio(path):
+    """Decode to (samples, sample_rate) without resampling; float32 or int PCM."""
+    try:
+        # PCM wav is memory-mapped: a float32 file is used in place without a copy
+        file_sr, wav = wavfile.read(path, mmap=True)
+        return wav, file_sr
+    except ValueError:
+        pass  # Not a plain RIFF/PCM wav (e.g. mp3 from gTTS, 24-bit)
+    if soundfile is not None:
+        try:
+            # libsndfile >= 1.1 also decodes mp3 in-process
+            return soundfile.read(path, dtype='float32', always_2d=False)
+        except RuntimeError:
+            pass
+    # Anything else goes through librosa's audioread/ffmpeg path
+    wav, file_sr = librosa.core.load(path, sr=None, mono=False)
+    return wav.T, file_sr
+
 def load_wav(path, sr):
-    return librosa.core.load(path, sr=sr)[0]
+    wav, file_sr = _read_audio(path)
+    if wav.dtype.kind in 'iu':
+        info = np.iinfo(wav.dtype)
+        wav = (wav.astype(np.float32) - (info.max + info.min + 1) / 2) / ((info.max - info.min + 1) / 2)
+    elif wav.dtype != np.float32:
+        wav = wav.astype(np.float32)
+    if wav.ndim > 1:
+        wav = wav.mean(axis=1, dtype=np.float32)
+    if file_sr != sr:
+        # Polyphase resampling: exact rational ratio, much cheaper than an FFT resampler
+        g = gcd(int(file_sr), int(sr))
+        wav = signal.resample_poly(wav, sr // g, file_sr // g).astype(np.float32)
+    return wav
+
+# Mel cache: repeated audio (the same TTS clip, a training clip sampled again)
+# skips decoding and DSP. Entries are keyed by the file's content hash and the
+# hparams that shape the spectrogram; a small in-memory LRU sits in front of a
+# directory of .npy files that are memory-mapped on load. The directory is kept
+# under MEL_CACHE_MAX_MB by deleting the least recently used files. Set
+# MEL_CACHE_DIR to an empty string to keep the cache in memory only.
+MEL_CACHE_SIZE = int(os.getenv('MEL_CACHE_SIZE', '64'))
+MEL_CACHE_DIR = os.getenv('MEL_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp', 'mel_cache'))
+MEL_CACHE_MAX_MB = float(os.getenv('MEL_CACHE_MAX_MB', '512'))
+_PRUNE_EVERY = 16  # Disk writes between two size checks of the directory
+_TMP_MAX_AGE = 3600  # Temp files older than this were left by a crashed writer
+_MEL_HPARAMS = ('num_mels', 'n_fft', 'hop_size', 'win_size', 'sample_rate', 'frame_shift_ms', 'use_lws',
+                'signal_normalization', 'allow_clipping_in_normalization', 'symmetric_mels', 'max_abs_value',
+                'preemphasize', 'preemphasis', 'min_level_db', 'ref_level_db', 'fmin', 'fmax')
+
+_mel_cache = OrderedDict()
+_file_hashes = {}
+_mel_cache_lock = threading.Lock()
+_disk_writes = 0
+
+def _file_digest(path):
+    st = os.stat(path)
+    stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _file_hashes.get(stamp)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        if len(_file_hashes) > 4 * MEL_CACHE_SIZE:
+            _file_hashes.clear()
+        _file_hashes[stamp] = digest
+    return digest
+
+def _hparams_fingerprint(sr):
+    params = [(name, hp.data.get(name)) for name in _MEL_HPARAMS] + [('load_sr', sr), ('resampler', 'polyphase')]
+    return hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()[:16]
+
+def _remember_mel(key, mel):
+    with _mel_cache_lock:
+        _mel_cache[key] = mel
+        _mel_cache.move_to_end(key)
+        while len(_mel_cache) > MEL_CACHE_SIZE:
+            _mel_cache.popitem(last=False)
+
+def load_mel(path, sr):
+    """Mel spectrogram of an audio file, i.e. melspectrogram(load_wav(path, sr)), cached.
+
+    The returned array is shared with the cache and read-only; copy it before
+    modifying it in place.
+    """
+    key = '{}_{}'.format(_file_digest(path), _hparams_fingerprint(sr))
+    with _mel_cache_lock:
+        mel = _mel_cache.get(key)
+        if mel is not None:
+            _mel_cache.move_to_end(key)
+            return mel
+
+    npy_path = os.path.join(MEL_CACHE_DIR, key + '.npy') if MEL_CACHE_DIR else None
+    if npy_path and os.path.exists(npy_path):
+        try:
+            mel = np.load(npy_path, mmap_mode='r')
+            os.utime(npy_path)  # Recently used: pruned last
+        except (ValueError, OSError):
+            mel = None  # Truncated, unreadable or just pruned; recompute it
+    if mel is None:
+        mel = melspectrogram(load_wav(path, sr)).astype(np.float32)
+        mel.flags.writeable = False
+        if npy_path:
+            _store_mel(npy_path, mel)
+
+    _remember_mel(key, mel)
+    return mel
+
+def _store_mel(npy_path, mel):
+    global _disk_writes
+    os.makedirs(MEL_CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(MEL_CACHE_DIR, '.{}.tmp'.format(uuid.uuid4().hex))
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, mel)
+        os.replace(tmp_path, npy_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    with _mel_cache_lock:
+        _disk_writes += 1
+        prune = _disk_writes % _PRUNE_EVERY == 1
+    if prune:
+        prune_mel_cache()
+
+def prune_mel_cache(max_bytes=None):
+    """Delete the least recently used .npy files until the directory fits the budget."""
+    if max_bytes is None:
+        max_bytes = int(MEL_CACHE_MAX_MB * 1024 * 1024)
+    if not MEL_CACHE_DIR or not os.path.isdir(MEL_CACHE_DIR):
+        return
+    now = time.time()
+    files, total = [], 0
+    with os.scandir(MEL_CACHE_DIR) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith('.'):
+                if now - st.st_mtime > _TMP_MAX_AGE:
+                    _remove_quietly(entry.path)
+                continue
+            if entry.name.endswith('.npy'):
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        # Already mapped arrays stay valid; the file is only unlinked
+        _remove_quietly(path)
+        total -= size
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def clear_mel_cache(disk=False):
+    with _mel_cache_lock:
+        _mel_cache.clear()
+        _file_hashes.clear()
+    if disk and MEL_CACHE_DIR and os.path.isdir(MEL_CACHE_DIR):
+        for name in os.listdir(MEL_CACHE_DIR):
+            if name.endswith('.npy'):
+                os.remove(os.path.join(MEL_CACHE_DIR, name))
 
 def save_wav(wav, path, sr):
     wav *= 32767 / max(0.01, np.max(np.abs(wav)))
@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+import uuid
+import numpy as np
+import cv2
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+class AvatarProfile:
+	"""Everything datagen needs for a static face image, computed once.
+
+	frame: the BGR base frame the prediction is pasted into
+	coords: (y1, y2, x1, x2) face box in the base frame
+	face / face_masked: img_size x img_size crops, the latter with the lower half zeroed
+	"""
+	def __init__(self, frame, coords, face, face_masked):
+		self.frame = frame
+		self.coords = tuple(int(c) for c in coords)
+		self.face = face
+		self.face_masked = face_masked
+		# Network input for one frame, identical to what datagen builds per batch
+		self.img = (np.concatenate((face_masked, face), axis=2) / 255.).astype(np.float32)
+
+def profile_key(face_path, args):
+	h = hashlib.sha1()
+	with open(face_path, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b''):
+			h.update(block)
+	h.update('pads={} box={} img_size={} face_det_res={}'.format(
+		list(args.pads), list(args.box), args.img_size, args.face_det_res).encode())
+	return h.hexdigest()
+
+def build_profile(face_path, args, face_detect):
+	frame = cv2.imread(face_path)
+	if frame is None:
+		raise ValueError('Could not read face image: {}'.format(face_path))
+	return profile_from_frame(frame, args, face_detect)
+
+def profile_from_frame(frame, args, face_detect):
+	if args.box[0] == -1:
+		crop, coords = face_detect([frame])[0]
+	else:
+		y1, y2, x1, x2 = args.box
+		crop, coords = frame[y1: y2, x1:x2], (y1, y2, x1, x2)
+
+	face = cv2.resize(crop, (args.img_size, args.img_size))
+	face_masked = face.copy()
+	face_masked[args.img_size//2:] = 0
+	return AvatarProfile(frame, coords, face, face_masked)
+
+def _profile_path(profile_dir, key):
+	return os.path.join(profile_dir, '{}.npz'.format(key))
+
+def save_profile(profile, path):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+	with open(tmp_path, 'wb') as f:
+		np.savez(f, frame=profile.frame, coords=np.array(profile.coords),
+				face=profile.face, face_masked=profile.face_masked)
+	os.replace(tmp_path, path)
+
+def read_profile(path):
+	with np.load(path) as data:
+		return AvatarProfile(data['frame'], data['coords'], data['face'], data['face_masked'])
+
+def load_profile(face_path, args, face_detect, profile_dir=None):
+	"""Return the AvatarProfile of a static face image.
+
+	Profiles are keyed by the image content and the arguments that shape the
+	face crop, held in memory for the life of the process and persisted as
+	.npz files so that new processes skip detection as well.
+	"""
+	profile_dir = profile_dir or PROFILE_DIR
+	key = profile_key(face_path, args)
+
+	with _profiles_lock:
+		profile = _profiles.get(key)
+	if profile is not None:
+		return profile
+
+	path = _profile_path(profile_dir, key)
+	profile = None
+	if os.path.isfile(path):
+		try:
+			profile = read_profile(path)
+		except Exception as e:
+			print('Ignoring unreadable avatar profile {}: {}'.format(path, e))
+
+	if profile is None:
+		print('Building avatar profile for {}'.format(face_path))
+		profile = build_profile(face_path, args, face_detect)
+		save_profile(profile, path)
+
+	with _profiles_lock:
+		_profiles[key] = profile
+	return profile
@@ -9,7 +9,7 @@ import torch
 sys.path.append('../')
 import audio
 import face_detection
-from models import Wav2Lip
+import model_registry
 
 parser = argparse.ArgumentParser(description='Code to generate results on ReSyncED evaluation set')
 
@@ -170,31 +170,8 @@ mel_step_size = 16
 device = 'cuda' if torch.cuda.is_available() else 'cpu'
 print('Using {} for inference.'.format(device))
 
-detector = face_detection.FaceAlignment(face_detection.LandmarksType._2D, 
-											flip_input=False, device=device)
-
-def _load(checkpoint_path):
-	if device == 'cuda':
-		checkpoint = torch.load(checkpoint_path)
-	else:
-		checkpoint = torch.load(checkpoint_path,
-								map_location=lambda storage, loc: storage)
-	return checkpoint
-
-def load_model(path):
-	model = Wav2Lip()
-	print("Load checkpoint from: {}".format(path))
-	checkpoint = _load(path)
-	s = checkpoint["state_dict"]
-	new_s = {}
-	for k, v in s.items():
-		new_s[k.replace('module.', '')] = v
-	model.load_state_dict(new_s)
-
-	model = model.to(device)
-	return model.eval()
-
-model = load_model(args.checkpoint_path)
+detector = model_registry.get_detector(device)
+model = model_registry.get_wav2lip(args.checkpoint_path, device)
 
 def main():
 	if not os.path.isdir(args.results_dir): os.makedirs(args.results_dir)
@@ -218,8 +195,7 @@ def main():
 		subprocess.call(command, shell=True)
 		temp_audio = '../temp/temp.wav'
 
-		wav = audio.load_wav(temp_audio, 16000)
-		mel = audio.melspectrogram(wav)
+		mel = audio.load_mel(temp_audio, 16000)
 
 		if np.isnan(mel.reshape(-1)).sum() > 0:
 			raise ValueError('Mel contains nan!')
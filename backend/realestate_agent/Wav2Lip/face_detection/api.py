@@ -45,7 +45,8 @@ ROOT = os.path.dirname(os.path.abspath(__file__))
 
 class FaceAlignment:
     def __init__(self, landmarks_type, network_size=NetworkSize.LARGE,
-                 device='cuda', flip_input=False, face_detector='sfd', verbose=False):
+                 device='cuda', flip_input=False, face_detector='sfd', verbose=False,
+                 face_detector_kwargs=None):
         self.device = device
         self.flip_input = flip_input
         self.landmarks_type = landmarks_type
@@ -59,9 +60,24 @@ class FaceAlignment:
         # Get the face detector
         face_detector_module = __import__('face_detection.detection.' + face_detector,
                                           globals(), locals(), [face_detector], 0)
-        self.face_detector = face_detector_module.FaceDetector(device=device, verbose=verbose)
+        self.face_detector = face_detector_module.FaceDetector(device=device, verbose=verbose,
+                                                               **(face_detector_kwargs or {}))
+
+    def get_detections_for_batch(self, images, max_size=None):
+        """Detect the most confident face of every image of a batch.
+
+        With ``max_size``, images whose shorter side is larger are downscaled
+        to that size for the detector only; the boxes are returned in the
+        coordinates of the original images.
+        """
+        h, w = images.shape[1:3]
+        scale_x = scale_y = 1.
+        if max_size is not None and min(h, w) > max_size:
+            scale = max_size / float(min(h, w))
+            size = (int(round(w * scale)), int(round(h * scale)))
+            scale_x, scale_y = size[0] / float(w), size[1] / float(h)
+            images = np.stack([cv2.resize(image, size, interpolation=cv2.INTER_AREA) for image in images])
 
-    def get_detections_for_batch(self, images):
         images = images[..., ::-1]
         detected_faces = self.face_detector.detect_from_batch(images.copy())
         results = []
@@ -73,7 +89,8 @@ class FaceAlignment:
             d = d[0]
             d = np.clip(d, 0, None)
             
-            x1, y1, x2, y2 = map(int, d[:-1])
+            x1, y1, x2, y2 = d[:-1] / [scale_x, scale_y, scale_x, scale_y]
+            x1, y1, x2, y2 = map(int, (x1, y1, min(x2, w), min(y2, h)))
             results.append((x1, y1, x2, y2))
 
         return results
\ No newline at end of file
@@ -26,6 +26,11 @@ except BaseException:
         else:
             return 1.0 * w * h / (sa + sb - w * h)
 
+try:
+    from torchvision.ops import batched_nms as _batched_nms
+except BaseException:
+    _batched_nms = None
+
 
 def bboxlog(x1, y1, x2, y2, axc, ayc, aww, ahh):
     xc, yc, ww, hh = (x2 + x1) / 2, (y2 + y1) / 2, x2 - x1, y2 - y1
@@ -64,6 +69,63 @@ def nms(dets, thresh):
     return keep
 
 
+def batch_nms(bboxlists, thresh, score_thresh=0.5):
+    """Non-maximum suppression over the detections of a whole batch at once.
+
+    Arguments:
+        bboxlists {numpy.ndarray} -- [num_candidates, BB, 5] (x1, y1, x2, y2, score)
+            detections, as returned by ``batch_detect``
+        thresh {float} -- IoU above which the lower scoring box is suppressed
+
+    Keyword Arguments:
+        score_thresh {float} -- only boxes scoring above this are returned (default: {0.5})
+
+    Returns:
+        A list with, for every image, a [num_kept, 5] array of boxes, best first.
+
+    Boxes at or below ``score_thresh`` are dropped before the suppression: they
+    could only suppress boxes that score even lower, so the result is the same
+    as ``nms`` followed by the score filter. The remaining boxes of all images
+    are padded into one [BB, K] array and suppressed together, using
+    ``torchvision.ops.batched_nms`` when it is installed.
+    """
+    dets = np.asarray(bboxlists).transpose(1, 0, 2)
+    BB = dets.shape[0]
+    valid = dets[:, :, 4] > score_thresh
+    K = int(valid.sum(1).max()) if dets.shape[1] else 0
+    if K == 0:
+        return [np.zeros((0, 5), dtype=dets.dtype) for _ in range(BB)]
+
+    # Best first per image, padding (invalid) entries at the end
+    order = np.argsort(-np.where(valid, dets[:, :, 4], -np.inf), axis=1, kind='stable')[:, :K]
+    padded = np.take_along_axis(dets, order[:, :, np.newaxis], axis=1)
+    alive = np.take_along_axis(valid, order, axis=1)
+
+    if _batched_nms is not None:
+        b, k = np.nonzero(alive)
+        boxes = torch.from_numpy(padded[b, k, :4].astype(np.float32))
+        # nms() measures boxes in pixels, inclusive of x2/y2
+        boxes[:, 2:] += 1
+        scores = torch.from_numpy(padded[b, k, 4].astype(np.float32))
+        keep = _batched_nms(boxes, scores, torch.from_numpy(b), thresh).numpy()
+        kept_b, kept_k = b[keep], k[keep]
+        return [padded[i, kept_k[kept_b == i]] for i in range(BB)]
+
+    x1, y1, x2, y2 = padded[:, :, 0], padded[:, :, 1], padded[:, :, 2], padded[:, :, 3]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    for i in range(K - 1):
+        # Box i of every image that is still alive suppresses the later boxes it overlaps
+        xx1, yy1 = np.maximum(x1[:, i:i + 1], x1[:, i + 1:]), np.maximum(y1[:, i:i + 1], y1[:, i + 1:])
+        xx2, yy2 = np.minimum(x2[:, i:i + 1], x2[:, i + 1:]), np.minimum(y2[:, i:i + 1], y2[:, i + 1:])
+
+        w, h = np.maximum(0.0, xx2 - xx1 + 1), np.maximum(0.0, yy2 - yy1 + 1)
+        ovr = w * h / (areas[:, i:i + 1] + areas[:, i + 1:] - w * h)
+
+        alive[:, i + 1:] &= ~((ovr > thresh) & alive[:, i:i + 1])
+
+    return [padded[i, alive[i]] for i in range(BB)]
+
+
 def encode(matched, priors, variances):
     """Encode the variances from the priorbox layers into the ground truth boxes
     we have matched (based on jaccard overlap) with the prior boxes.
@@ -16,6 +16,57 @@ from .net_s3fd import s3fd
 from .bbox import *
 
 
+_prior_grids = {}
+
+
+def prior_grid(FH, FW, stride):
+    """Prior boxes (cx, cy, w, h) of every position of a FH x FW feature map.
+
+    The grid only depends on the feature map size, i.e. on the input
+    resolution, so it is built once per size and reused.
+    """
+    key = (FH, FW, stride)
+    priors = _prior_grids.get(key)
+    if priors is None:
+        axc = stride / 2 + np.arange(FW) * stride
+        ayc = stride / 2 + np.arange(FH) * stride
+        grid = np.zeros((FH, FW, 4))
+        grid[:, :, 0] = axc[np.newaxis, :]
+        grid[:, :, 1] = ayc[:, np.newaxis]
+        grid[:, :, 2:] = stride * 4
+        priors = torch.from_numpy(grid).float()
+        _prior_grids[key] = priors
+    return priors
+
+
+def decode_detections(olist, thresh=0.05):
+    """Decode the raw s3fd outputs of a batch into boxes.
+
+    Every position of every feature map level whose face score exceeds
+    ``thresh`` in at least one image of the batch is decoded for all images
+    at once. Returns a tensor of shape [BB, num_candidates, 5] holding
+    (x1, y1, x2, y2, score).
+    """
+    variances = [0.1, 0.2]
+    dets = []
+    for i in range(len(olist) // 2):
+        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
+        FB, FC, FH, FW = ocls.size()  # feature map size
+        stride = 2**(i + 2)    # 4,8,16,32,64,128
+        hindex, windex = np.where((ocls[:, 1, :, :] > thresh).any(0).numpy())
+        if len(hindex) == 0:
+            continue
+        hindex, windex = torch.from_numpy(hindex), torch.from_numpy(windex)
+        priors = prior_grid(FH, FW, stride)[hindex, windex].unsqueeze(0)
+        loc = oreg[:, :, hindex, windex].permute(0, 2, 1)
+        score = ocls[:, 1, hindex, windex]
+        box = batch_decode(loc, priors, variances)
+        dets.append(torch.cat([box, score.unsqueeze(2)], 2))
+    if not dets:
+        return torch.zeros((olist[0].size(0), 0, 5))
+    return torch.cat(dets, 1)
+
+
 def detect(net, img, device):
     img = img - np.array([104, 117, 123])
     img = img.transpose(2, 0, 1)
@@ -29,27 +80,10 @@ def detect(net, img, device):
     with torch.no_grad():
         olist = net(img)
 
-    bboxlist = []
     for i in range(len(olist) // 2):
         olist[i * 2] = F.softmax(olist[i * 2], dim=1)
     olist = [oelem.data.cpu() for oelem in olist]
-    for i in range(len(olist) // 2):
-        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
-        FB, FC, FH, FW = ocls.size()  # feature map size
-        stride = 2**(i + 2)    # 4,8,16,32,64,128
-        anchor = stride * 4
-        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
-        for Iindex, hindex, windex in poss:
-            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
-            score = ocls[0, 1, hindex, windex]
-            loc = oreg[0, :, hindex, windex].contiguous().view(1, 4)
-            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]])
-            variances = [0.1, 0.2]
-            box = decode(loc, priors, variances)
-            x1, y1, x2, y2 = box[0] * 1.0
-            # cv2.rectangle(imgshow,(int(x1),int(y1)),(int(x2),int(y2)),(0,0,255),1)
-            bboxlist.append([x1, y1, x2, y2, score])
-    bboxlist = np.array(bboxlist)
+    bboxlist = decode_detections(olist)[0].numpy()
     if 0 == len(bboxlist):
         bboxlist = np.zeros((1, 5))
 
@@ -67,27 +101,10 @@ def batch_detect(net, imgs, device):
     with torch.no_grad():
         olist = net(imgs)
 
-    bboxlist = []
     for i in range(len(olist) // 2):
         olist[i * 2] = F.softmax(olist[i * 2], dim=1)
     olist = [oelem.data.cpu() for oelem in olist]
-    for i in range(len(olist) // 2):
-        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
-        FB, FC, FH, FW = ocls.size()  # feature map size
-        stride = 2**(i + 2)    # 4,8,16,32,64,128
-        anchor = stride * 4
-        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
-        for Iindex, hindex, windex in poss:
-            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
-            score = ocls[:, 1, hindex, windex]
-            loc = oreg[:, :, hindex, windex].contiguous().view(BB, 1, 4)
-            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]]).view(1, 1, 4)
-            variances = [0.1, 0.2]
-            box = batch_decode(loc, priors, variances)
-            box = box[:, 0] * 1.0
-            # cv2.rectangle(imgshow,(int(x1),int(y1)),(int(x2),int(y2)),(0,0,255),1)
-            bboxlist.append(torch.cat([box, score.unsqueeze(1)], 1).cpu().numpy())
-    bboxlist = np.array(bboxlist)
+    bboxlist = decode_detections(olist).permute(1, 0, 2).numpy()
     if 0 == len(bboxlist):
         bboxlist = np.zeros((1, BB, 5))
 
@@ -3,6 +3,7 @@ import cv2
 from torch.utils.model_zoo import load_url
 
 from ..core import FaceDetector
+from ...utils import load_checkpoint
 
 from .net_s3fd import s3fd
 from .bbox import *
@@ -21,7 +22,7 @@ class SFDDetector(FaceDetector):
         if not os.path.isfile(path_to_detector):
             model_weights = load_url(models_urls['s3fd'])
         else:
-            model_weights = torch.load(path_to_detector)
+            model_weights = load_checkpoint(path_to_detector)
 
         self.face_detector = s3fd()
         self.face_detector.load_state_dict(model_weights)
@@ -40,11 +41,7 @@ class SFDDetector(FaceDetector):
 
     def detect_from_batch(self, images):
         bboxlists = batch_detect(self.face_detector, images, device=self.device)
-        keeps = [nms(bboxlists[:, i, :], 0.3) for i in range(bboxlists.shape[1])]
-        bboxlists = [bboxlists[keep, i, :] for i, keep in enumerate(keeps)]
-        bboxlists = [[x for x in bboxlist if x[-1] > 0.5] for bboxlist in bboxlists]
-
-        return bboxlists
+        return batch_nms(bboxlists, 0.3, score_thresh=0.5)
 
     @property
     def reference_scale(self):
@@ -8,6 +8,19 @@ import numpy as np
 import cv2
 
 
+def load_checkpoint(path):
+    """torch.load onto the CPU, memory-mapping the file when possible.
+
+    A mapped checkpoint is read lazily and its pages are shared by every
+    worker process that maps the same file. Older torch versions (no mmap
+    argument) and legacy, non-zip checkpoints fall back to a regular load.
+    """
+    try:
+        return torch.load(path, map_location='cpu', mmap=True)
+    except (TypeError, RuntimeError):
+        return torch.load(path, map_location='cpu')
+
+
 def _gaussian(
         size=3, sigma=0.25, amplitude=1, normalize=False, width=None,
         height=None, sigma_horz=None, sigma_vert=None, mean_horz=0.5,
@@ -0,0 +1,57 @@
+import numpy as np
+import cv2
+
+class FaceTracker:
+	"""Propagates a face box from a keyframe to the following frames.
+
+	The face region of the last keyframe is kept as a small grayscale template
+	and located again in every new frame with normalized cross-correlation,
+	searching only a margin around the previous box. The match score tells the
+	caller when the face has changed too much and needs a fresh detection.
+	"""
+	def __init__(self, template_size=64, search_margin=0.25):
+		self.template_size = template_size
+		self.search_margin = search_margin
+		self.template = None
+		self.rect = None
+		self.scale = 1.
+
+	def reset(self, frame, rect):
+		x1, y1, x2, y2 = rect
+		self.rect = [int(x1), int(y1), int(x2), int(y2)]
+		self.scale = self.template_size / float(max(x2 - x1, y2 - y1, 1))
+		self.template = self._gray(frame[y1:y2, x1:x2])
+
+	def track(self, frame):
+		"""Return (rect, score) for frame; score is in [-1, 1], higher is better."""
+		if self.template is None:
+			return None, -1.
+
+		h, w = frame.shape[:2]
+		x1, y1, x2, y2 = self.rect
+		mx = int((x2 - x1) * self.search_margin)
+		my = int((y2 - y1) * self.search_margin)
+		sx1, sy1 = max(0, x1 - mx), max(0, y1 - my)
+		sx2, sy2 = min(w, x2 + mx), min(h, y2 + my)
+
+		search = self._gray(frame[sy1:sy2, sx1:sx2])
+		th, tw = self.template.shape
+		if search.shape[0] < th or search.shape[1] < tw:
+			return None, -1.
+
+		scores = cv2.matchTemplate(search, self.template, cv2.TM_CCOEFF_NORMED)
+		_, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+
+		nx1 = int(round(sx1 + dx / self.scale))
+		ny1 = int(round(sy1 + dy / self.scale))
+		nx1 = min(max(0, nx1), w - (x2 - x1))
+		ny1 = min(max(0, ny1), h - (y2 - y1))
+		self.rect = [nx1, ny1, nx1 + (x2 - x1), ny1 + (y2 - y1)]
+		if not np.isfinite(score):
+			score = -1.
+		return list(self.rect), float(score)
+
+	def _gray(self, image):
+		image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+		size = (max(1, int(round(image.shape[1] * self.scale))), max(1, int(round(image.shape[0] * self.scale))))
+		return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
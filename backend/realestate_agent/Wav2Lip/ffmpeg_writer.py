@@ -0,0 +1,41 @@
+import subprocess
+import numpy as np
+
+class FFmpegWriter:
+	"""Drop-in for cv2.VideoWriter that pipes raw BGR frames into ffmpeg.
+
+	ffmpeg encodes H.264 and muxes the audio track in the same pass, as the
+	frames arrive, so encoding overlaps with inference and no intermediate
+	video is written to disk.
+	"""
+	def __init__(self, outfile, fps, size, audio_path, preset='veryfast', crf=18):
+		w, h = size
+		command = ['ffmpeg', '-y', '-loglevel', 'error',
+					'-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', '{}x{}'.format(w, h), '-r', str(fps), '-i', '-',
+					'-i', audio_path,
+					'-map', '0:v:0', '-map', '1:a:0',
+					# yuv420p needs even dimensions
+					'-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+					'-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+					'-c:a', 'aac', outfile]
+		self.outfile = outfile
+		self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+	def write(self, frame):
+		try:
+			self.process.stdin.write(np.ascontiguousarray(frame).data)
+		except BrokenPipeError:
+			self.process.wait()
+			raise RuntimeError('ffmpeg exited with code {} while encoding {}'.format(
+								self.process.returncode, self.outfile))
+
+	def release(self):
+		self.process.stdin.close()
+		if self.process.wait() != 0:
+			raise RuntimeError('ffmpeg exited with code {} while encoding {}'.format(
+								self.process.returncode, self.outfile))
+
+	def abort(self):
+		if self.process.poll() is None:
+			self.process.kill()
+		self.process.wait()
@@ -138,9 +138,7 @@ class Dataset(object):
 
             try:
                 wavpath = join(vidname, "audio.wav")
-                wav = audio.load_wav(wavpath, hparams.sample_rate)
-
-                orig_mel = audio.melspectrogram(wav).T
+                orig_mel = audio.load_mel(wavpath, hparams.sample_rate).T
             except Exception as e:
                 continue
 
@@ -1,11 +1,17 @@
 from os import listdir, path
 import numpy as np
 import scipy, cv2, os, sys, argparse, audio
-import json, subprocess, random, string
+import json, random, string
+import shutil, tempfile, uuid, time
+from contextlib import contextmanager
 from tqdm import tqdm
 from glob import glob
+from itertools import islice
 import torch, face_detection
-from models import Wav2Lip
+import model_registry
+import avatar_profile
+from ffmpeg_writer import FFmpegWriter
+from face_tracker import FaceTracker
 import platform
 
 parser = argparse.ArgumentParser(description='Inference code to lip-sync videos in the wild using Wav2Lip models')
@@ -17,8 +23,11 @@ parser.add_argument('--face', type=str,
 					help='Filepath of video/image that contains faces to use', required=True)
 parser.add_argument('--audio', type=str, 
 					help='Filepath of video/audio file to use as raw audio source', required=True)
-parser.add_argument('--outfile', type=str, help='Video path to save result. See default for an e.g.', 
-								default='results/result_voice.mp4')
+parser.add_argument('--outfile', type=str, help='Video path to save result (default: results/result_voice_<job id>.mp4)', 
+								default=None)
+parser.add_argument('--workdir', type=str, default=None,
+					help='Directory for the temporary files of this job. By default a fresh directory under temp/ '
+					'is created and removed once the job succeeds, so that concurrent jobs never share files')
 
 parser.add_argument('--static', type=bool, 
 					help='If True, then use only first video frame for inference', default=False)
@@ -30,6 +39,9 @@ parser.add_argument('--pads', nargs='+', type=int, default=[0, 10, 0, 0],
 
 parser.add_argument('--face_det_batch_size', type=int, 
 					help='Batch size for face detection', default=16)
+parser.add_argument('--face_det_res', type=int, default=None,
+					help='Run face detection on copies of the frames downscaled so that their shorter side is at most this '
+					'many pixels (e.g. 360). Boxes are mapped back, the output keeps the native resolution')
 parser.add_argument('--wav2lip_batch_size', type=int, help='Batch size for Wav2Lip model(s)', default=128)
 
 parser.add_argument('--resize_factor', default=1, type=int, 
@@ -50,11 +62,30 @@ parser.add_argument('--rotate', default=False, action='store_true',
 parser.add_argument('--nosmooth', default=False, action='store_true',
 					help='Prevent smoothing face detections over a short temporal window')
 
-args = parser.parse_args()
-args.img_size = 96
+parser.add_argument('--detect_every', type=int, default=1,
+					help='Run the face detector only on every Nth video frame and track the face box in between. '
+					'1 (default) detects on every frame')
+parser.add_argument('--track_threshold', type=float, default=0.6,
+					help='Tracker match score (-1 to 1) below which the face detector is re-run on that frame')
 
-if os.path.isfile(args.face) and args.face.split('.')[1] in ['jpg', 'png', 'jpeg']:
-	args.static = True
+parser.add_argument('--preset', type=str, default='veryfast',
+					help='x264 preset used to encode the result (ultrafast ... veryslow)')
+parser.add_argument('--crf', type=int, default=18,
+					help='x264 constant rate factor of the result, lower is better quality')
+
+parser.add_argument('--frame_chunk_size', type=int, default=128,
+					help='Number of video frames read, detected and lip-synced at a time. Bounds memory use for long videos')
+
+parser.add_argument('--profile_dir', type=str, default=None,
+					help='Where precomputed avatar profiles of static face images are stored (default: profiles/)')
+
+def parse_args(argv=None):
+	args = parser.parse_args(argv)
+	args.img_size = 96
+
+	if os.path.isfile(args.face) and args.face.split('.')[1] in ['jpg', 'png', 'jpeg']:
+		args.static = True
+	return args
 
 def get_smoothened_boxes(boxes, T):
 	for i in range(len(boxes)):
@@ -65,21 +96,63 @@ def get_smoothened_boxes(boxes, T):
 		boxes[i] = np.mean(window, axis=0)
 	return boxes
 
-def face_detect(images):
-	detector = face_detection.FaceAlignment(face_detection.LandmarksType._2D, 
-											flip_input=False, device=device)
-
+class BoxSmoother:
+	"""Streaming equivalent of get_smoothened_boxes.
+
+	Boxes are pushed one at a time and released as soon as their T-wide
+	window is complete, so only T boxes are ever held back.
+	"""
+	def __init__(self, T):
+		self.T = T
+		self.pending = []
+		self.released = []
+		self.count = 0
+
+	def push(self, box):
+		self.pending.append(np.asarray(box))
+		self.count += 1
+		ready = []
+		while len(self.pending) >= self.T:
+			ready.append(self._release(self.pending[:self.T]))
+		return ready
+
+	def flush(self):
+		if self.count < self.T:
+			# Too short to ever fill a window; defer to the batch version
+			boxes = get_smoothened_boxes(np.array(self.pending), self.T)
+			self.pending = []
+			return list(boxes)
+
+		ready = []
+		while self.pending:
+			# The tail windows reuse the last T boxes, already smoothed ones included
+			window = self.released[len(self.released) - (self.T - len(self.pending)):] + self.pending
+			ready.append(self._release(window))
+		return ready
+
+	def _release(self, window):
+		box = np.mean(window, axis=0).astype(self.pending[0].dtype)
+		self.pending.pop(0)
+		self.released = (self.released + [box])[-self.T:]
+		return box
+
+def load_detector():
+	return model_registry.get_detector(device)
+
+def detect_face_boxes(images, args, detector):
 	batch_size = args.face_det_batch_size
 	
 	while 1:
 		predictions = []
 		try:
-			for i in tqdm(range(0, len(images), batch_size)):
-				predictions.extend(detector.get_detections_for_batch(np.array(images[i:i + batch_size])))
+			for i in range(0, len(images), batch_size):
+				predictions.extend(detector.get_detections_for_batch(np.array(images[i:i + batch_size]),
+															max_size=args.face_det_res))
 		except RuntimeError:
 			if batch_size == 1: 
 				raise RuntimeError('Image too big to run face detection on GPU. Please use the --resize_factor argument')
 			batch_size //= 2
+			args.face_det_batch_size = batch_size
 			print('Recovering from OOM error; New batch size: {}'.format(batch_size))
 			continue
 		break
@@ -88,7 +161,7 @@ def face_detect(images):
 	pady1, pady2, padx1, padx2 = args.pads
 	for rect, image in zip(predictions, images):
 		if rect is None:
-			cv2.imwrite('temp/faulty_frame.jpg', image) # check this frame where the face was not detected.
+			cv2.imwrite(os.path.join(args.workdir, 'faulty_frame.jpg'), image) # check this frame where the face was not detected.
 			raise ValueError('Face not detected! Ensure the video contains a face in all the frames.')
 
 		y1 = max(0, rect[1] - pady1)
@@ -98,36 +171,159 @@ def face_detect(images):
 		
 		results.append([x1, y1, x2, y2])
 
-	boxes = np.array(results)
+	return results
+
+def track_face_boxes(images, args, detector, tracker, start_index):
+	"""detect_face_boxes for --detect_every > 1.
+
+	The detector runs, in one batch, only on the keyframes of images; the
+	boxes of the other frames are propagated by the tracker, falling back to
+	the detector whenever the tracker loses confidence.
+	"""
+	keyframes = [i for i in range(len(images)) if (start_index + i) % args.detect_every == 0]
+	detected = dict(zip(keyframes, detect_face_boxes([images[i] for i in keyframes], args, detector)))
+
+	results = []
+	for i, image in enumerate(images):
+		rect = detected.get(i)
+		if rect is None:
+			rect, score = tracker.track(image)
+			if rect is None or score < args.track_threshold:
+				rect = detect_face_boxes([image], args, detector)[0]
+				tracker.reset(image, rect)
+		else:
+			tracker.reset(image, rect)
+		results.append(rect)
+	return results
+
+def face_detect(images, args, detector=None):
+	if detector is None:
+		detector = load_detector()
+
+	boxes = np.array(detect_face_boxes(images, args, detector))
 	if not args.nosmooth: boxes = get_smoothened_boxes(boxes, T=5)
 	results = [[image[y1: y2, x1:x2], (y1, y2, x1, x2)] for image, (x1, y1, x2, y2) in zip(images, boxes)]
-
-	del detector
 	return results 
 
-def datagen(frames, mels):
-	img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
+def read_frames(args):
+	video_stream = cv2.VideoCapture(args.face)
+	try:
+		while 1:
+			still_reading, frame = video_stream.read()
+			if not still_reading:
+				break
+			if args.resize_factor > 1:
+				frame = cv2.resize(frame, (frame.shape[1]//args.resize_factor, frame.shape[0]//args.resize_factor))
+
+			if args.rotate:
+				frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+
+			y1, y2, x1, x2 = args.crop
+			if x2 == -1: x2 = frame.shape[1]
+			if y2 == -1: y2 = frame.shape[0]
+
+			yield frame[y1:y2, x1:x2]
+	finally:
+		video_stream.release()
+
+@contextmanager
+def timed(timings, stage):
+	"""Add the time spent in the block to timings[stage] (seconds)."""
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		timings[stage] = timings.get(stage, 0.) + time.perf_counter() - start
+
+def face_stream(args, num_frames, detector=None, timings=None):
+	"""Yield (frame, face, coords) for num_frames output frames of the video.
+
+	Frames are read, detected and smoothed --frame_chunk_size at a time, so
+	memory use does not depend on the length of the video. When the audio is
+	longer than the video, the video is read again from the start and the
+	boxes found on the first pass are reused.
+	"""
+	timings = {} if timings is None else timings
+	if detector is None and args.box[0] == -1:
+		detector = load_detector()
+
+	smoother = None if args.nosmooth or args.box[0] != -1 else BoxSmoother(T=5)
+	tracker = FaceTracker() if args.detect_every > 1 else None
+	boxes = []
+	pending = []
+
+	def release(ready):
+		for x1, y1, x2, y2 in ready:
+			frame = pending.pop(0)
+			boxes.append((x1, y1, x2, y2))
+			yield frame, frame[y1: y2, x1:x2], (y1, y2, x1, x2)
+
+	frames = read_frames(args)
+	while len(boxes) + len(pending) < num_frames:
+		chunk = list(islice(frames, min(args.frame_chunk_size, num_frames - len(boxes) - len(pending))))
+		if not chunk:
+			break
 
-	if args.box[0] == -1:
-		if not args.static:
-			face_det_results = face_detect(frames) # BGR2RGB for CNN face detection
+		if args.box[0] != -1:
+			y1, y2, x1, x2 = args.box
+			rects = [[x1, y1, x2, y2]] * len(chunk)
+		elif tracker is not None:
+			with timed(timings, 'face_detection'):
+				rects = track_face_boxes(chunk, args, detector, tracker, len(boxes) + len(pending))
 		else:
-			face_det_results = face_detect([frames[0]])
-	else:
-		print('Using the specified bounding box instead of face detection...')
-		y1, y2, x1, x2 = args.box
-		face_det_results = [[f[y1: y2, x1:x2], (y1, y2, x1, x2)] for f in frames]
+			with timed(timings, 'face_detection'):
+				rects = detect_face_boxes(chunk, args, detector)
+
+		for frame, rect in zip(chunk, rects):
+			pending.append(frame)
+			ready = [rect] if smoother is None else smoother.push(rect)
+			yield from release(ready)
+	frames.close()
+
+	if smoother is not None and pending:
+		yield from release(smoother.flush())
+
+	if not boxes:
+		raise ValueError('No frames could be read from {}'.format(args.face))
+
+	produced = len(boxes)
+	while produced < num_frames:
+		for frame, (x1, y1, x2, y2) in zip(read_frames(args), boxes):
+			if produced == num_frames:
+				break
+			yield frame, frame[y1: y2, x1:x2], (y1, y2, x1, x2)
+			produced += 1
+
+def profile_datagen(profile, mels, args):
+	# Static image with a precomputed profile: the face input is the same for
+	# every frame, and the prediction is always pasted into the same box of one
+	# working copy of the base frame.
+	frame = profile.frame.copy()
+	full_img_batch = np.repeat(profile.img[np.newaxis], min(args.wav2lip_batch_size, len(mels)), axis=0)
+	for i in range(0, len(mels), args.wav2lip_batch_size):
+		mel_batch = np.asarray(mels[i:i + args.wav2lip_batch_size])
+		n = len(mel_batch)
+
+		img_batch = full_img_batch[:n]
+		mel_batch = np.reshape(mel_batch, [n, mel_batch.shape[1], mel_batch.shape[2], 1])
+
+		yield img_batch, mel_batch, [frame] * n, [profile.coords] * n
 
-	for i, m in enumerate(mels):
-		idx = 0 if args.static else i%len(frames)
-		frame_to_save = frames[idx].copy()
-		face, coords = face_det_results[idx].copy()
+def datagen(faces, mels, args, profile=None):
+	if profile is not None:
+		yield from profile_datagen(profile, mels, args)
+		return
 
+	img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
+
+	# Frames come straight from the video reader and are pasted into only once,
+	# so they need no defensive copies.
+	for m, (frame, face, coords) in zip(mels, faces):
 		face = cv2.resize(face, (args.img_size, args.img_size))
 			
 		img_batch.append(face)
 		mel_batch.append(m)
-		frame_batch.append(frame_to_save)
+		frame_batch.append(frame)
 		coords_batch.append(coords)
 
 		if len(img_batch) >= args.wav2lip_batch_size:
@@ -154,75 +350,71 @@ def datagen(frames, mels):
 		yield img_batch, mel_batch, frame_batch, coords_batch
 
 mel_step_size = 16
+TEMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
 device = 'cuda' if torch.cuda.is_available() else 'cpu'
 print('Using {} for inference.'.format(device))
 
-def _load(checkpoint_path):
-	if device == 'cuda':
-		checkpoint = torch.load(checkpoint_path)
-	else:
-		checkpoint = torch.load(checkpoint_path,
-								map_location=lambda storage, loc: storage)
-	return checkpoint
-
 def load_model(path):
-	model = Wav2Lip()
-	print("Load checkpoint from: {}".format(path))
-	checkpoint = _load(path)
-	s = checkpoint["state_dict"]
-	new_s = {}
-	for k, v in s.items():
-		new_s[k.replace('module.', '')] = v
-	model.load_state_dict(new_s)
-
-	model = model.to(device)
-	return model.eval()
-
-def main():
+	return model_registry.get_wav2lip(path, device)
+
+def run(args, model=None, detector=None, timings=None):
+	"""Lip-sync args.face to args.audio and write args.outfile.
+
+	Callers that generate many videos pass an already loaded model and
+	detector so that only the forward passes are paid per job. All
+	temporary files of the job live in args.workdir. If a timings dict is
+	given, the seconds spent in face detection, the Wav2Lip forward passes
+	and encoding are added to it.
+	"""
+	timings = {} if timings is None else timings
+	job_id = uuid.uuid4().hex[:12]
+	if args.outfile is None:
+		args.outfile = 'results/result_voice_{}.mp4'.format(job_id)
+	owns_workdir = args.workdir is None
+	if owns_workdir:
+		os.makedirs(TEMP_DIR, exist_ok=True)
+		args.workdir = tempfile.mkdtemp(prefix='job_{}_'.format(job_id), dir=TEMP_DIR)
+	else:
+		os.makedirs(args.workdir, exist_ok=True)
+
+	try:
+		outfile = _run(args, model, detector, timings)
+	except BaseException:
+		print('Temporary files of the failed job are kept in {}'.format(args.workdir))
+		raise
+	if owns_workdir:
+		shutil.rmtree(args.workdir, ignore_errors=True)
+	print('Result saved to {}'.format(outfile))
+	print('Timings: ' + ', '.join('{} {:.2f}s'.format(k, v) for k, v in timings.items()))
+	return outfile
+
+def _run(args, model, detector, timings):
+	profile = None
 	if not os.path.isfile(args.face):
 		raise ValueError('--face argument must be a valid path to video/image file')
 
 	elif args.face.split('.')[1] in ['jpg', 'png', 'jpeg']:
-		full_frames = [cv2.imread(args.face)]
+		with timed(timings, 'face_detection'):
+			profile = avatar_profile.load_profile(args.face, args,
+						lambda images: face_detect(images, args, detector), args.profile_dir)
 		fps = args.fps
 
 	else:
 		video_stream = cv2.VideoCapture(args.face)
 		fps = video_stream.get(cv2.CAP_PROP_FPS)
-
-		print('Reading video frames...')
-
-		full_frames = []
-		while 1:
-			still_reading, frame = video_stream.read()
-			if not still_reading:
-				video_stream.release()
-				break
-			if args.resize_factor > 1:
-				frame = cv2.resize(frame, (frame.shape[1]//args.resize_factor, frame.shape[0]//args.resize_factor))
-
-			if args.rotate:
-				frame = cv2.rotate(frame, cv2.cv2.ROTATE_90_CLOCKWISE)
-
-			y1, y2, x1, x2 = args.crop
-			if x2 == -1: x2 = frame.shape[1]
-			if y2 == -1: y2 = frame.shape[0]
-
-			frame = frame[y1:y2, x1:x2]
-
-			full_frames.append(frame)
-
-	print ("Number of frames available for inference: "+str(len(full_frames)))
-
-	if not args.audio.endswith('.wav'):
-		print('Extracting raw audio...')
-		command = 'ffmpeg -y -i {} -strict -2 {}'.format(args.audio, 'temp/temp.wav')
-
-		subprocess.call(command, shell=True)
-		args.audio = 'temp/temp.wav'
-
-	wav = audio.load_wav(args.audio, 16000)
-	mel = audio.melspectrogram(wav)
+		video_stream.release()
+
+		if args.static:
+			frames = read_frames(args)
+			first_frame = next(frames, None)
+			frames.close()
+			if first_frame is None:
+				raise ValueError('No frames could be read from {}'.format(args.face))
+			with timed(timings, 'face_detection'):
+				profile = avatar_profile.profile_from_frame(first_frame, args,
+							lambda images: face_detect(images, args, detector))
+
+	mel = audio.load_mel(args.audio, 16000)
 	print(mel.shape)
 
 	if np.isnan(mel.reshape(-1)).sum() > 0:
@@ -241,40 +433,52 @@ def main():
 
 	print("Length of mel chunks: {}".format(len(mel_chunks)))
 
-	full_frames = full_frames[:len(mel_chunks)]
-
 	batch_size = args.wav2lip_batch_size
-	gen = datagen(full_frames.copy(), mel_chunks)
-
-	for i, (img_batch, mel_batch, frames, coords) in enumerate(tqdm(gen, 
-											total=int(np.ceil(float(len(mel_chunks))/batch_size)))):
-		if i == 0:
-			model = load_model(args.checkpoint_path)
-			print ("Model loaded")
-
-			frame_h, frame_w = full_frames[0].shape[:-1]
-			out = cv2.VideoWriter('temp/result.avi', 
-									cv2.VideoWriter_fourcc(*'DIVX'), fps, (frame_w, frame_h))
-
-		img_batch = torch.FloatTensor(np.transpose(img_batch, (0, 3, 1, 2))).to(device)
-		mel_batch = torch.FloatTensor(np.transpose(mel_batch, (0, 3, 1, 2))).to(device)
-
-		with torch.no_grad():
-			pred = model(mel_batch, img_batch)
-
-		pred = pred.cpu().numpy().transpose(0, 2, 3, 1) * 255.
-		
-		for p, f, c in zip(pred, frames, coords):
-			y1, y2, x1, x2 = c
-			p = cv2.resize(p.astype(np.uint8), (x2 - x1, y2 - y1))
-
-			f[y1:y2, x1:x2] = p
-			out.write(f)
-
-	out.release()
+	faces = None if profile is not None else face_stream(args, len(mel_chunks), detector, timings)
+	gen = datagen(faces, mel_chunks, args, profile)
+
+	os.makedirs(os.path.dirname(os.path.abspath(args.outfile)), exist_ok=True)
+	out = None
+	try:
+		for i, (img_batch, mel_batch, frames, coords) in enumerate(tqdm(gen, 
+												total=int(np.ceil(float(len(mel_chunks))/batch_size)))):
+			if i == 0:
+				if model is None:
+					model = load_model(args.checkpoint_path)
+					print ("Model loaded")
+
+				frame_h, frame_w = frames[0].shape[:-1]
+				out = FFmpegWriter(args.outfile, fps, (frame_w, frame_h), args.audio, preset=args.preset, crf=args.crf)
+
+			img_batch = torch.FloatTensor(np.transpose(img_batch, (0, 3, 1, 2))).to(device)
+			mel_batch = torch.FloatTensor(np.transpose(mel_batch, (0, 3, 1, 2))).to(device)
+
+			# .cpu() waits for the device, so the forward time is complete
+			with timed(timings, 'wav2lip_forward'):
+				with torch.no_grad():
+					pred = model(mel_batch, img_batch)
+				pred = pred.cpu().numpy()
+
+			pred = pred.transpose(0, 2, 3, 1) * 255.
+			
+			for p, f, c in zip(pred, frames, coords):
+				y1, y2, x1, x2 = c
+				p = cv2.resize(p.astype(np.uint8), (x2 - x1, y2 - y1))
+
+				f[y1:y2, x1:x2] = p
+				with timed(timings, 'encode'):
+					out.write(f)
+	except BaseException:
+		if out is not None:
+			out.abort()
+		raise
+
+	with timed(timings, 'encode'):
+		out.release()
+	return args.outfile
 
-	command = 'ffmpeg -y -i {} -i {} -strict -2 -q:v 1 {}'.format(args.audio, 'temp/result.avi', args.outfile)
-	subprocess.call(command, shell=platform.system() != 'Windows')
+def main():
+	run(parse_args())
 
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,62 @@
+"""Process-wide cache of loaded models.
+
+Every (checkpoint, device) pair is loaded at most once per process and then
+shared by inference.py, preprocess.py, the evaluation scripts and the
+long-lived lip-sync worker.
+"""
+
+import os
+import threading
+import torch
+import face_detection
+from face_detection.utils import load_checkpoint
+from models import Wav2Lip
+
+_lock = threading.RLock()
+_detectors = {}
+_wav2lip_models = {}
+
+def _load_state_dict(model, state_dict, device):
+	if device == 'cpu':
+		# Let the parameters keep pointing at the (mapped) checkpoint tensors
+		# instead of copying them, when this torch version supports it
+		try:
+			model.load_state_dict(state_dict, assign=True)
+			return
+		except TypeError:
+			pass
+	model.load_state_dict(state_dict)
+
+def get_wav2lip(path, device):
+	key = (os.path.abspath(path), device)
+	with _lock:
+		model = _wav2lip_models.get(key)
+		if model is None:
+			print("Load checkpoint from: {}".format(path))
+			checkpoint = load_checkpoint(path)
+			s = checkpoint["state_dict"]
+			new_s = {}
+			for k, v in s.items():
+				new_s[k.replace('module.', '')] = v
+
+			model = Wav2Lip()
+			_load_state_dict(model, new_s, device)
+			model = model.to(device).eval()
+			_wav2lip_models[key] = model
+		return model
+
+def get_detector(device, path_to_detector=None):
+	key = (path_to_detector and os.path.abspath(path_to_detector), device)
+	with _lock:
+		detector = _detectors.get(key)
+		if detector is None:
+			kwargs = {'path_to_detector': path_to_detector} if path_to_detector else {}
+			detector = face_detection.FaceAlignment(face_detection.LandmarksType._2D,
+										flip_input=False, device=device, face_detector_kwargs=kwargs)
+			_detectors[key] = detector
+		return detector
+
+def clear():
+	with _lock:
+		_detectors.clear()
+		_wav2lip_models.clear()
@@ -19,6 +19,7 @@ import audio
 from hparams import hparams as hp
 
 import face_detection
+import model_registry
 
 parser = argparse.ArgumentParser()
 
@@ -26,11 +27,12 @@ parser.add_argument('--ngpu', help='Number of GPUs across which to run in parall
 parser.add_argument('--batch_size', help='Single GPU Face detection batch size', default=32, type=int)
 parser.add_argument("--data_root", help="Root folder of the LRS2 dataset", required=True)
 parser.add_argument("--preprocessed_root", help="Root folder of the preprocessed dataset", required=True)
+parser.add_argument('--face_det_res', help='Run face detection on frames downscaled so that their shorter side is at most '
+					'this many pixels. Crops are still taken from the full resolution frames', default=None, type=int)
 
 args = parser.parse_args()
 
-fa = [face_detection.FaceAlignment(face_detection.LandmarksType._2D, flip_input=False, 
-									device='cuda:{}'.format(id)) for id in range(args.ngpu)]
+fa = [model_registry.get_detector('cuda:{}'.format(id)) for id in range(args.ngpu)]
 
 template = 'ffmpeg -loglevel panic -y -i {} -strict -2 {}'
 # template2 = 'ffmpeg -hide_banner -loglevel panic -threads 1 -y -i {} -async 1 -ac 1 -vn -acodec pcm_s16le -ar 16000 {}'
@@ -56,7 +58,7 @@ def process_video_file(vfile, args, gpu_id):
 
 	i = -1
 	for fb in batches:
-		preds = fa[gpu_id].get_detections_for_batch(np.asarray(fb))
+		preds = fa[gpu_id].get_detections_for_batch(np.asarray(fb), max_size=args.face_det_res)
 
 		for j, f in enumerate(preds):
 			i += 1
@@ -1,9 +1,11 @@
 import os
 import re
+import time
+import asyncio
 import logging
 import webbrowser
 import uuid
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime
 from pathlib import Path
 
@@ -12,6 +14,13 @@ from fastapi import HTTPException
 from pydantic import BaseModel
 import dotenv
 
+from app.tts_executor import tts_executor
+from app.tts_cache import tts_cache, make_cache_key
+from app.llm_cache import llm_cache, make_cache_key as make_llm_cache_key
+from app.openai_client import get_async_client
+from app.metrics import metrics, timed
+from app.storage import storage_manager
+
 # --------------------------------------------------------------------
 # Logging Configuration
 # --------------------------------------------------------------------
@@ -36,6 +45,8 @@ dotenv.load_dotenv()  # Load API keys and configs from .env file
 DEFAULT_TEMP_DIR = "static/audio"  # Directory where TTS audio files will be stored
 SUPPORTED_LANGUAGES = {"en": "English", "ar": "Arabic"}
 DEFAULT_LANGUAGE = "en"
+TTS_SPEED = 1.3  # 30% faster than normal
+TTS_BATCH_MAX_SENTENCES = int(os.getenv("TTS_BATCH_MAX_SENTENCES", "100"))
 
 # Ensure required directories exist
 os.makedirs(DEFAULT_TEMP_DIR, exist_ok=True)
@@ -60,6 +71,8 @@ class AIResponse(BaseModel):
     audio_url: Optional[str] = None    # Public URL (/static/audio/...)
     video_path: Optional[str] = None
     urls: List[str] = []
+    cached: bool = False                # Text served from the LLM response cache
+    timings: Dict[str, float] = {}      # Seconds per pipeline stage (llm, tts, urls, total)
     timestamp: str = datetime.utcnow().isoformat()
 
 
@@ -78,6 +91,98 @@ def get_audio_url(filename: str) -> str:
     return f"/static/audio/{os.path.basename(filename)}"
 
 
+_URL_RE = re.compile(r'https?://[^\s<>"\']+')
+
+
+def extract_urls(text: str) -> List[str]:
+    """Extract http(s) URLs from generated text."""
+    return _URL_RE.findall(text)
+
+
+class UrlExtractor:
+    """
+    Extract URLs from a stream of text deltas as soon as each one is complete.
+
+    A URL is complete once a character that cannot be part of it follows. Only
+    a short tail (or the unfinished URL) is kept between deltas, and the URLs
+    reported over the whole stream equal ``extract_urls`` on the full text.
+    """
+
+    _SCHEME_LEN = len("https://")
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a text delta and return the URLs it completed."""
+        self.buffer += delta
+        urls = []
+        keep_from = len(self.buffer) - self._SCHEME_LEN
+        for match in _URL_RE.finditer(self.buffer):
+            if match.end() < len(self.buffer):
+                urls.append(match.group())
+                keep_from = max(keep_from, match.end())
+            else:
+                # Might still grow with the next delta
+                keep_from = match.start()
+        self.buffer = self.buffer[max(0, keep_from):]
+        return urls
+
+    def flush(self) -> List[str]:
+        """Return the URL left unfinished at the end of the stream, if any."""
+        urls = extract_urls(self.buffer)
+        self.buffer = ""
+        return urls
+
+
+# A sentence ends at terminal punctuation (optionally followed by closing
+# quotes/brackets) plus whitespace, or at a line break.
+_SENTENCE_END_RE = re.compile(r'[.!?\u061F\u2026]+["\'\u201D)\]]*\s+|\n+')
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "st", "sq", "ft", "no", "vs", "etc", "e.g", "i.e", "approx", "apt"}
+# Unlike ".", these never end an abbreviation or a number
+_STRONG_ENDINGS = set("!?\u061F")
+
+
+class SentenceSplitter:
+    """
+    Cut a stream of text deltas into complete sentences.
+
+    Sentences shorter than ``min_chars`` are merged with the next one so the
+    TTS engine is not called for fragments like "Sure." or list numbers.
+    "!" and "?" always end a sentence, however short.
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a text delta and return the sentences it completed."""
+        self.buffer += delta
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if not candidate:
+                continue
+            if not _STRONG_ENDINGS.intersection(match.group()):
+                if len(candidate) < self.min_chars:
+                    continue
+                last_word = self.buffer[start:match.start()].rsplit(None, 1)[-1:]
+                if match.group().startswith(".") and last_word and last_word[0].lower() in _ABBREVIATIONS:
+                    continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Return whatever text is left once the stream has ended."""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
+
+
 # --------------------------------------------------------------------
 # AI Response (ChatGPT)
 # --------------------------------------------------------------------
@@ -86,7 +191,9 @@ async def generate_ai_response(
     model: str = "gpt-3.5-turbo",
     temperature: float = 0.7,
     max_tokens: int = 1000,
-    system_prompt: Optional[str] = None
+    system_prompt: Optional[str] = None,
+    use_cache: bool = True,
+    client: Optional[openai.AsyncOpenAI] = None
 ) -> AIResponse:
     """
     Generate AI response using OpenAI's API with error handling and logging.
@@ -97,16 +204,31 @@ async def generate_ai_response(
         temperature: Controls randomness (0.0 to 2.0)
         max_tokens: Maximum number of tokens
         system_prompt: System role description for the assistant
+        use_cache: Reuse a cached response for a repeated prompt
+            (only applies to deterministic temperatures)
+        client: OpenAI client to use (defaults to the shared one)
 
     Returns:
         AIResponse with generated text + extracted URLs
     """
+    cache_key = None
+    if use_cache and llm_cache.is_cacheable(temperature):
+        cache_key = make_llm_cache_key(
+            user_text, system_prompt, model, temperature, max_tokens
+        )
+        hit = await llm_cache.get(cache_key)
+        if hit is not None:
+            value, age = hit
+            logger.info(f"LLM cache hit ({age:.0f}s old) for model: {model}")
+            return AIResponse(text=value["text"], urls=extract_urls(value["text"]), cached=True)
+
     if not os.getenv("OPENAI_API_KEY"):
         error_msg = "OpenAI API key not found in environment variables"
         logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
-    client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # Reuse the shared, pooled client unless one is injected
+    client = client or get_async_client()
 
     try:
         # Prepare messages for ChatGPT
@@ -118,19 +240,23 @@ async def generate_ai_response(
         logger.info(f"Sending request to OpenAI with model: {model}")
 
         # Make the request to OpenAI
-        response = await client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        with metrics.stage("llm"):
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
 
         # Extract generated text
         ai_text = response.choices[0].message.content
         logger.info(f"Generated response with {len(ai_text)} characters")
 
         # Extract URLs from the response
-        urls = re.findall(r'https?://[^\s<>"\']+', ai_text)
+        urls = extract_urls(ai_text)
+
+        if cache_key is not None and ai_text:
+            await llm_cache.set(cache_key, {"text": ai_text})
 
         return AIResponse(
             text=ai_text,
@@ -143,6 +269,66 @@ async def generate_ai_response(
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+async def stream_ai_response(
+    user_text: str,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    system_prompt: Optional[str] = None,
+    client: Optional[openai.AsyncOpenAI] = None,
+    messages: Optional[List[Dict[str, str]]] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the AI response from OpenAI as text deltas.
+
+    Args:
+        user_text: The input text from the user
+        model: OpenAI model to use
+        temperature: Controls randomness (0.0 to 2.0)
+        max_tokens: Maximum number of tokens
+        system_prompt: System role description for the assistant
+        client: OpenAI client to use (defaults to the shared one)
+        messages: Full conversation to send instead of system_prompt + user_text
+
+    Yields:
+        Text deltas in the order the model produces them
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        error_msg = "OpenAI API key not found in environment variables"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=error_msg)
+
+    # Reuse the shared, pooled client unless one is injected
+    client = client or get_async_client()
+
+    if messages is None:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": user_text})
+
+    logger.info(f"Streaming request to OpenAI with model: {model}")
+    start = time.perf_counter()
+    first_token = True
+    with metrics.stage("llm_stream"):
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token:
+                    metrics.observe_stage("llm_first_token", time.perf_counter() - start)
+                    first_token = False
+                yield delta
+
+
 # --------------------------------------------------------------------
 # TTS (Text-to-Speech)
 # --------------------------------------------------------------------
@@ -159,10 +345,10 @@ async def generate_tts_audio(
         text: The text to convert
         language: Language code (e.g., 'en', 'ar')
         voice: Optional voice choice (not currently used)
-        output_path: Optional custom file path
+        output_path: Optional custom file path (skips the TTS cache)
 
     Returns:
-        Tuple: (audio_path, audio_url)
+        Dict with audio_path, audio_url and whether it was a cache hit
     """
     if not text.strip():
         error_msg = "Text cannot be empty"
@@ -170,23 +356,39 @@ async def generate_tts_audio(
         raise HTTPException(status_code=400, detail=error_msg)
 
     try:
-        from tts.tts_simple import generate_tts_audio as simple_generate_tts_audio
-
-        # Create unique filename if not provided
-        if not output_path:
-            filename = generate_unique_filename()
-            output_path = os.path.join(DEFAULT_TEMP_DIR, filename)
-
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        # Call simple TTS implementation
-        audio_path = simple_generate_tts_audio(
-            text=text,
-            output_path=output_path,
-            language=language,
-            speed=1.3  # 30% faster than normal
-        )
+        from tts.engines import get_engine_for_language
+
+        # Configured engine (TTS_ENGINE), or the fallback for languages it lacks
+        engine = get_engine_for_language(language)
+
+        async def synthesize(path: str) -> Optional[str]:
+            # Engines block (network or model inference), so they run in the TTS pool
+            with metrics.stage("tts"):
+                return await tts_executor.run(
+                    engine.synthesize,
+                    text=text,
+                    output_path=path,
+                    language=language,
+                    voice=voice,
+                    speed=TTS_SPEED
+                )
+
+        cached = False
+        if output_path:
+            # Explicit destination: bypass the cache
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            audio_path = await synthesize(output_path)
+            if not audio_path:
+                raise RuntimeError("TTS engine produced no audio")
+        else:
+            # Identical text/settings reuse the clip that is already on disk
+            key = make_cache_key(
+                text, language, voice, speed=TTS_SPEED, engine=engine.name, extension=engine.extension
+            )
+            audio_path, cached = await tts_cache.get_or_create(key, synthesize, extension=engine.extension)
+
+        if not cached:
+            storage_manager.register(audio_path)
 
         # Convert saved path into a URL for frontend
         audio_url = get_audio_url(os.path.basename(audio_path))
@@ -195,14 +397,17 @@ async def generate_tts_audio(
         if not audio_url.startswith('/'):
             audio_url = f'/{audio_url}'
             
-        logger.info(f"TTS generated: {audio_path} (URL: {audio_url})")
+        logger.info(f"TTS {'cache hit' if cached else 'generated'}: {audio_path} (URL: {audio_url})")
         return {
             'audio_path': audio_path,
-            'audio_url': audio_url
+            'audio_url': audio_url,
+            'cached': cached
         }
 
+    except HTTPException:
+        raise
     except ImportError as e:
-        error_msg = f"TTS module not installed. Please install pyttsx3: pip install pyttsx3"
+        error_msg = f"TTS engine dependencies not installed: {e.name}"
         logger.error(f"{error_msg} Error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=error_msg)
     except Exception as e:
@@ -212,6 +417,291 @@ async def generate_tts_audio(
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+async def concatenate_audio(paths: List[str], output_path: str) -> str:
+    """
+    Join audio clips, in order, into a single WAV file with ffmpeg.
+
+    Args:
+        paths: Clips to join (any format ffmpeg can decode)
+        output_path: Destination WAV file
+
+    Returns:
+        output_path
+    """
+    command = ["ffmpeg", "-y", "-loglevel", "error"]
+    for path in paths:
+        command += ["-i", path]
+    command += [
+        "-filter_complex", f"concat=n={len(paths)}:v=0:a=1",
+        "-ac", "1", "-f", "wav", output_path
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {stderr.decode(errors='replace').strip()}")
+    return output_path
+
+
+async def synthesize_batch(
+    sentences: List[str],
+    language: str = DEFAULT_LANGUAGE,
+    voice: Optional[str] = None,
+    concatenate: bool = False
+) -> Dict[str, Any]:
+    """
+    Synthesize many sentences in one call.
+
+    Sentences run concurrently, at most TTS_WORKERS at a time, so a large
+    batch neither floods the TTS queue nor lets its tail time out while
+    waiting. Repeated sentences and ones already in the TTS cache are
+    synthesized only once. A sentence that fails is retried once; if it still
+    fails, only its segment carries the error.
+
+    Args:
+        sentences: Sentences to convert, in playback order
+        language: Language code (e.g., 'en', 'ar')
+        voice: Optional voice choice
+        concatenate: Also join the clips into one WAV file
+
+    Returns:
+        Dict with per-sentence 'segments' (text, audio_url, cached, error),
+        the number of 'failed' segments and, when concatenate is set and every
+        segment succeeded, the 'audio_url' of the joined file (else None)
+    """
+    sentences = [sentence.strip() for sentence in sentences]
+    if not sentences or not all(sentences):
+        raise HTTPException(status_code=400, detail="Sentences cannot be empty")
+    if len(sentences) > TTS_BATCH_MAX_SENTENCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many sentences ({len(sentences)}), the limit is {TTS_BATCH_MAX_SENTENCES}"
+        )
+
+    slots = asyncio.Semaphore(tts_executor.max_workers)
+
+    async def synthesize(sentence: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return await generate_tts_audio(sentence, language=language, voice=voice)
+            except HTTPException as e:
+                if e.status_code < 500:
+                    raise
+                logger.warning(f"Retrying TTS for batch sentence after error: {e.detail}")
+                return await generate_tts_audio(sentence, language=language, voice=voice)
+
+    results = await asyncio.gather(*(synthesize(sentence) for sentence in sentences), return_exceptions=True)
+    segments = []
+    for sentence, result in zip(sentences, results):
+        if isinstance(result, BaseException):
+            logger.error(f"TTS failed for batch sentence: {result}")
+            segments.append({
+                "text": sentence, "audio_url": None, "cached": False,
+                "error": str(getattr(result, "detail", result)),
+            })
+        else:
+            segments.append({
+                "text": sentence, "audio_url": result["audio_url"], "cached": result["cached"], "error": None,
+            })
+    failed = sum(1 for segment in segments if segment["error"])
+    if failed == len(segments):
+        raise HTTPException(status_code=500, detail=f"Failed to generate TTS audio: {segments[0]['error']}")
+
+    audio_url = None
+    if concatenate and not failed:
+        paths = [result["audio_path"] for result in results]
+        if len(paths) == 1:
+            audio_url = results[0]["audio_url"]
+        else:
+            # Segment files are content-addressed, so their names identify the joined audio
+            key = make_cache_key(
+                "\n".join(os.path.basename(path) for path in paths),
+                language, voice, speed=TTS_SPEED, engine="concat"
+            )
+
+            async def join(path: str) -> str:
+                with metrics.stage("tts_concat"):
+                    return await concatenate_audio(paths, path)
+
+            try:
+                audio_path, cached = await tts_cache.get_or_create(key, join, extension="wav")
+            except Exception as e:
+                logger.error(f"Failed to concatenate TTS audio: {e}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"Failed to concatenate TTS audio: {e}")
+            if not cached:
+                storage_manager.register(audio_path)
+            audio_url = get_audio_url(os.path.basename(audio_path))
+
+    return {"segments": segments, "failed": failed, "audio_url": audio_url}
+
+
+async def stream_speech_response(
+    user_text: str,
+    language: str = DEFAULT_LANGUAGE,
+    voice: Optional[str] = None,
+    **kwargs
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the AI response and synthesize it sentence by sentence.
+
+    Every sentence is sent to TTS as soon as the model finishes it, while the
+    model keeps generating, so the first audio segment is ready long before
+    the full reply is.
+
+    Yields event dicts, with audio segments in sentence order:
+        {"type": "text", "delta": ...}
+        {"type": "audio", "index": ..., "text": ..., "audio_url": ...}
+        {"type": "audio_error", "index": ..., "text": ..., "detail": ...}
+        {"type": "done", "text": ..., "urls": [...]}
+        {"type": "error", "detail": ...}
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    pending: asyncio.Queue = asyncio.Queue()
+    tts_tasks: List[asyncio.Task] = []
+
+    async def synthesize(index: int, sentence: str) -> Dict[str, Any]:
+        try:
+            tts_result = await generate_tts_audio(sentence, language=language, voice=voice)
+            return {"type": "audio", "index": index, "text": sentence, "audio_url": tts_result["audio_url"]}
+        except Exception as e:
+            logger.error(f"TTS failed for sentence {index}: {e}")
+            return {"type": "audio_error", "index": index, "text": sentence, "detail": str(getattr(e, "detail", e))}
+
+    def schedule(sentence: str) -> None:
+        task = asyncio.create_task(synthesize(len(tts_tasks), sentence))
+        tts_tasks.append(task)
+        pending.put_nowait(task)
+
+    async def produce_text() -> str:
+        splitter = SentenceSplitter()
+        parts = []
+        try:
+            async for delta in stream_ai_response(user_text, **kwargs):
+                parts.append(delta)
+                await events.put({"type": "text", "delta": delta})
+                for sentence in splitter.feed(delta):
+                    schedule(sentence)
+            rest = splitter.flush()
+            if rest:
+                schedule(rest)
+        finally:
+            pending.put_nowait(None)
+        return "".join(parts)
+
+    text_task = asyncio.create_task(produce_text())
+
+    async def run() -> None:
+        try:
+            # Emit audio in sentence order while the text is still streaming
+            while (task := await pending.get()) is not None:
+                await events.put(await task)
+            text = await text_task
+            await events.put({"type": "done", "text": text, "urls": extract_urls(text)})
+        except Exception as e:
+            logger.error(f"Error streaming speech response: {e}", exc_info=True)
+            await events.put({"type": "error", "detail": str(getattr(e, "detail", e))})
+        finally:
+            await events.put(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+    finally:
+        # Client went away or we are done: stop any outstanding work
+        runner.cancel()
+        text_task.cancel()
+        for task in tts_tasks:
+            task.cancel()
+
+
+async def _replay(text: str) -> AsyncIterator[str]:
+    """Serve a cached reply through the same path as streamed deltas."""
+    yield text
+
+
+async def stream_chat_response(
+    user_text: str,
+    generate_audio: bool = True,
+    language: str = DEFAULT_LANGUAGE,
+    use_cache: bool = True,
+    **kwargs
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of ``process_user_input``.
+
+    Tokens are forwarded as they arrive and URLs are reported as soon as they
+    are complete; TTS runs once on the full reply.
+
+    Yields event dicts:
+        {"type": "token", "delta": ...}
+        {"type": "url", "url": ...}
+        {"type": "done", "text": ..., "urls": [...], "audio_url": ..., "cached": ...}
+        {"type": "error", "detail": ...}
+    """
+    model = kwargs.get("model", "gpt-3.5-turbo")
+    temperature = kwargs.get("temperature", 0.7)
+    max_tokens = kwargs.get("max_tokens", 1000)
+    system_prompt = kwargs.get("system_prompt")
+
+    extractor = UrlExtractor()
+    parts = []
+    urls = []
+    cached = False
+    try:
+        cache_key = None
+        hit = None
+        # A reply that depends on conversation history is not reusable
+        if use_cache and kwargs.get("messages") is None and llm_cache.is_cacheable(temperature):
+            cache_key = make_llm_cache_key(user_text, system_prompt, model, temperature, max_tokens)
+            hit = await llm_cache.get(cache_key)
+
+        if hit is not None:
+            cached = True
+            deltas = _replay(hit[0]["text"])
+        else:
+            deltas = stream_ai_response(user_text, **kwargs)
+
+        async for delta in deltas:
+            parts.append(delta)
+            yield {"type": "token", "delta": delta}
+            for url in extractor.feed(delta):
+                urls.append(url)
+                yield {"type": "url", "url": url}
+        for url in extractor.flush():
+            urls.append(url)
+            yield {"type": "url", "url": url}
+
+        text = "".join(parts)
+        if cache_key is not None and not cached and text:
+            await llm_cache.set(cache_key, {"text": text})
+
+        audio_path = None
+        audio_url = None
+        if generate_audio and text.strip():
+            try:
+                tts_result = await generate_tts_audio(text, language=language)
+                audio_path = tts_result.get("audio_path")
+                audio_url = tts_result.get("audio_url")
+            except Exception as e:
+                logger.error(f"Error generating TTS audio: {e}", exc_info=True)
+                # Continue without TTS rather than failing the entire request
+
+        yield {
+            "type": "done",
+            "text": text,
+            "urls": urls,
+            "audio_path": audio_path,
+            "audio_url": audio_url,
+            "cached": cached,
+        }
+
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {e}", exc_info=True)
+        yield {"type": "error", "detail": str(getattr(e, "detail", e))}
+
+
 # --------------------------------------------------------------------
 # URL Opening Utility
 # --------------------------------------------------------------------
@@ -249,16 +739,20 @@ async def process_user_input(
     Returns:
         Dict with AI response text, optional audio paths/urls, and extracted URLs
     """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
     try:
         # Step 1: AI Response
-        response = await generate_ai_response(user_text, **kwargs)
+        with timed(timings, "llm"):
+            response = await generate_ai_response(user_text, **kwargs)
 
         # Step 2: TTS Audio
         audio_path = None
         audio_url = None
         if generate_audio and response.text:
             try:
-                tts_result = await generate_tts_audio(response.text)
+                with timed(timings, "tts"):
+                    tts_result = await generate_tts_audio(response.text)
                 if tts_result:
                     audio_path = tts_result.get('audio_path')
                     audio_url = tts_result.get('audio_url')
@@ -273,14 +767,17 @@ async def process_user_input(
 
         # Step 3: Open URLs
         if open_urls and response.urls:
-            await open_urls_in_browser(response.urls)
+            with timed(timings, "urls"):
+                await open_urls_in_browser(response.urls)
 
         # Step 4: Return dictionary
         return {
             "text": response.text,
             "audio_path": audio_path,
             "audio_url": audio_url,
-            "urls": response.urls
+            "urls": response.urls,
+            "cached": response.cached,
+            "timings": {**timings, "total": round(time.perf_counter() - start, 4)}
         }
 
     except HTTPException:
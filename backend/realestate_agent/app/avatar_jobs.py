@@ -0,0 +1,316 @@
+import os
+import re
+import shutil
+import asyncio
+import logging
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Dict
+
+from pydantic import BaseModel
+
+from app.metrics import metrics, timed
+from app.storage import storage_manager
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "1"))          # Concurrent Wav2Lip processes
+AVATAR_QUEUE_SIZE = int(os.getenv("AVATAR_QUEUE_SIZE", "16"))   # Jobs waiting before we push back
+AVATAR_JOB_TTL = int(os.getenv("AVATAR_JOB_TTL", "3600"))       # Seconds finished jobs stay queryable
+AVATAR_JOB_TIMEOUT = float(os.getenv("AVATAR_JOB_TIMEOUT", "600"))  # Seconds a lip-sync run may take
+AVATAR_FACES_DIR = os.getenv("AVATAR_FACES_DIR", "static/avatars")
+VIDEO_DIR = "static/video"
+JOBS_TEMP_DIR = "temp/avatar_jobs"
+AVATAR_EXTENSIONS = (".jpg", ".jpeg", ".png", ".mp4")
+DEFAULT_AVATAR_FACE = Path(__file__).resolve().parent.parent / "Wav2Lip" / "face.jpg"
+
+
+class AvatarQueueFullError(Exception):
+    """Raised when the avatar job queue has no room for another job."""
+
+
+# --------------------------------------------------------------------
+# Data Models
+# --------------------------------------------------------------------
+class AvatarJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class AvatarJob(BaseModel):
+    """State of one avatar video generation job."""
+    job_id: str
+    status: AvatarJobStatus = AvatarJobStatus.QUEUED
+    avatar_id: str
+    text: Optional[str] = None
+    language: str = "en"
+    audio_path: Optional[str] = None
+    video_path: Optional[str] = None
+    video_url: Optional[str] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = {}      # Seconds per pipeline stage
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# --------------------------------------------------------------------
+# Utility Functions
+# --------------------------------------------------------------------
+def resolve_avatar_face(avatar_id: str) -> str:
+    """Map an avatar id to its face image/video under AVATAR_FACES_DIR."""
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", avatar_id):
+        raise ValueError(f"Invalid avatar id: {avatar_id}")
+
+    for extension in AVATAR_EXTENSIONS:
+        candidate = os.path.join(AVATAR_FACES_DIR, f"{avatar_id}{extension}")
+        if os.path.isfile(candidate):
+            return candidate
+
+    if avatar_id == "default" and DEFAULT_AVATAR_FACE.is_file():
+        return str(DEFAULT_AVATAR_FACE)
+    raise ValueError(f"Unknown avatar id: {avatar_id}")
+
+
+def _init_worker() -> None:
+    """
+    Pool process initializer: load the Wav2Lip model and face detector
+    before the first job, so that job does not pay for the load.
+    """
+    from avatar.lipsync_worker import get_lipsync_worker
+    try:
+        get_lipsync_worker()
+    except Exception as e:
+        # A failing initializer would break the whole pool; let jobs report it
+        logger.error(f"Could not preload the lip-sync models: {e}", exc_info=True)
+
+
+def _ping() -> None:
+    """No-op job used to start (and so warm up) the pool processes."""
+
+
+def _generate_video(face: str, audio: str, outfile: str, workdir: str) -> Dict[str, float]:
+    """
+    Runs in a pool process, which keeps its own resident lip-sync worker.
+    Returns the per-stage timings so the server process can record them.
+    """
+    from avatar.lipsync_worker import get_lipsync_worker
+    timings: Dict[str, float] = {}
+    get_lipsync_worker().generate(face, audio, outfile, workdir=workdir, timings=timings)
+    return timings
+
+
+# --------------------------------------------------------------------
+# Job Queue
+# --------------------------------------------------------------------
+class AvatarJobQueue:
+    """
+    Bounded queue of avatar jobs served by a pool of Wav2Lip processes.
+
+    Wav2Lip runs in separate processes, so long jobs never block the event
+    loop. At most ``concurrency`` jobs run at once and at most ``max_queued``
+    wait; beyond that ``submit`` raises AvatarQueueFullError so the API can
+    push back instead of piling up requests that would time out.
+    """
+
+    def __init__(self, concurrency: int = AVATAR_WORKERS, max_queued: int = AVATAR_QUEUE_SIZE):
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max(1, max_queued)
+        self.jobs: Dict[str, AvatarJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def start(self) -> None:
+        """Start the worker tasks and the process pool."""
+        os.makedirs(VIDEO_DIR, exist_ok=True)
+        os.makedirs(JOBS_TEMP_DIR, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._executor = self._create_executor()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i)) for i in range(self.concurrency)
+        ]
+        logger.info(
+            f"Avatar job queue started: {self.concurrency} workers, {self.max_queued} queue slots"
+        )
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: torch and CUDA do not survive a fork of the server process
+        executor = ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        # Processes start on demand; start them now so the models load in the
+        # background while the server begins serving
+        for _ in range(self.concurrency):
+            executor.submit(_ping)
+        return executor
+
+    def _replace_executor(self, failed: ProcessPoolExecutor) -> None:
+        """Swap in a fresh pool after a worker crashed or hung."""
+        if self._executor is not failed:
+            return  # Another job already replaced it
+        logger.warning("Restarting the Wav2Lip process pool")
+        self._executor = self._create_executor()
+        # A hung worker never returns on its own: terminate what is left
+        for process in list((getattr(failed, "_processes", None) or {}).values()):
+            process.terminate()
+        failed.shutdown(wait=False, cancel_futures=True)
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks and shut the process pool down."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Avatar job queue stopped")
+
+    def submit(
+        self,
+        avatar_id: str,
+        text: Optional[str] = None,
+        audio_path: Optional[str] = None,
+        language: str = "en",
+    ) -> AvatarJob:
+        """
+        Enqueue a job and return it immediately.
+
+        Raises:
+            ValueError: Unknown avatar or missing input
+            AvatarQueueFullError: No queue slot is free
+        """
+        if self._queue is None:
+            raise RuntimeError("Avatar job queue is not running")
+        if not text and not audio_path:
+            raise ValueError("Either text or audio is required")
+        resolve_avatar_face(avatar_id)
+
+        self._prune()
+        job = AvatarJob(
+            job_id=uuid.uuid4().hex,
+            avatar_id=avatar_id,
+            text=text,
+            audio_path=audio_path,
+            language=language,
+            created_at=datetime.utcnow(),
+        )
+        try:
+            self._queue.put_nowait(job.job_id)
+        except asyncio.QueueFull:
+            raise AvatarQueueFullError(
+                f"Avatar queue is full ({self.max_queued} jobs waiting)"
+            )
+        self.jobs[job.job_id] = job
+        if audio_path:
+            # Keep the audio until the job has used it
+            storage_manager.pin(audio_path)
+        logger.info(f"Queued avatar job {job.job_id} (avatar={avatar_id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[AvatarJob]:
+        return self.jobs.get(job_id)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than AVATAR_JOB_TTL."""
+        cutoff = datetime.utcnow() - timedelta(seconds=AVATAR_JOB_TTL)
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    async def _worker_loop(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Avatar worker {worker_id} crashed on job {job_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: AvatarJob) -> None:
+        job.status = AvatarJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        queue_wait = (job.started_at - job.created_at).total_seconds()
+        metrics.observe_stage("avatar_queue_wait", queue_wait)
+        job.timings["queue_wait"] = round(queue_wait, 4)
+        workdir = os.path.abspath(os.path.join(JOBS_TEMP_DIR, job.job_id))
+        os.makedirs(workdir, exist_ok=True)
+
+        try:
+            face = resolve_avatar_face(job.avatar_id)
+
+            if job.audio_path is None:
+                from app.agent_pipeline import generate_tts_audio
+                with timed(job.timings, "tts"):
+                    tts_result = await generate_tts_audio(job.text, language=job.language)
+                job.audio_path = tts_result["audio_path"]
+                storage_manager.pin(job.audio_path)
+
+            outfile = os.path.abspath(os.path.join(VIDEO_DIR, f"{job.job_id}.mp4"))
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                with metrics.stage("lipsync", job.timings):
+                    stage_timings = await asyncio.wait_for(
+                        loop.run_in_executor(
+                            executor,
+                            _generate_video,
+                            os.path.abspath(face),
+                            os.path.abspath(job.audio_path),
+                            outfile,
+                            workdir,
+                        ),
+                        AVATAR_JOB_TIMEOUT,
+                    )
+            except asyncio.TimeoutError:
+                # The worker is stuck and holds a concurrency slot until killed
+                self._replace_executor(executor)
+                raise RuntimeError(f"Lip-sync timed out after {AVATAR_JOB_TIMEOUT:.0f}s")
+            except BrokenProcessPool:
+                # A worker died (crash, OOM kill); later jobs need a working pool
+                self._replace_executor(executor)
+                raise RuntimeError("Lip-sync worker process died")
+            for stage, seconds in stage_timings.items():
+                metrics.observe_stage(stage, seconds)
+                job.timings[stage] = round(seconds, 4)
+
+            storage_manager.register(outfile)
+            job.video_path = outfile
+            job.video_url = f"/static/video/{job.job_id}.mp4"
+            job.status = AvatarJobStatus.COMPLETED
+            logger.info(f"Avatar job {job.job_id} completed: {job.video_url}")
+        except Exception as e:
+            job.status = AvatarJobStatus.FAILED
+            job.error = str(getattr(e, "detail", e))
+            logger.error(f"Avatar job {job.job_id} failed: {job.error}", exc_info=True)
+        finally:
+            job.finished_at = datetime.utcnow()
+            if job.audio_path:
+                storage_manager.unpin(job.audio_path)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+# Create a singleton instance
+avatar_job_queue = AvatarJobQueue()
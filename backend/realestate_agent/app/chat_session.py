@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+import logging
+from typing import Dict, List, Optional
+
+import openai
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+SESSION_MAX_HISTORY_TOKENS = int(os.getenv("SESSION_MAX_HISTORY_TOKENS", "2000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))        # Seconds before an idle session is dropped
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_SUMMARIZE = os.getenv("SESSION_SUMMARIZE", "1") != "0"          # Summarize trimmed turns instead of dropping them
+SUMMARY_MAX_TOKENS = 200
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat format adds per message
+
+_encodings: Dict[str, object] = {}
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count tokens with tiktoken when available, else estimate ~4 chars/token."""
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text))
+
+
+class ChatSession:
+    """
+    Server-side conversation history for one client.
+
+    The history sent to the model is kept within ``max_history_tokens``:
+    the oldest turns are trimmed first and, if summarization is enabled,
+    folded into a running summary that is sent as a system message.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        system_prompt: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        max_history_tokens: int = SESSION_MAX_HISTORY_TOKENS
+    ):
+        self.session_id = session_id
+        self.system_prompt = system_prompt
+        self.model = model
+        self.max_history_tokens = max_history_tokens
+        self.history: List[Dict[str, str]] = []
+        self.summary: Optional[str] = None
+        self.trimmed: List[Dict[str, str]] = []    # Turns waiting to be summarized
+        self.last_active = time.time()
+
+    def _tokens(self, message: Dict[str, str]) -> int:
+        return count_tokens(message["content"], self.model) + MESSAGE_OVERHEAD_TOKENS
+
+    def add_message(self, role: str, content: str) -> None:
+        self.history.append({"role": role, "content": content})
+        self.last_active = time.time()
+        self.trim()
+
+    def trim(self) -> None:
+        """Move the oldest messages out of the history until it fits the budget."""
+        budget = self.max_history_tokens
+        if self.summary:
+            budget -= count_tokens(self.summary, self.model) + MESSAGE_OVERHEAD_TOKENS
+        total = sum(self._tokens(m) for m in self.history)
+        # Always keep the latest message, even if it alone exceeds the budget
+        while total > budget and len(self.history) > 1:
+            message = self.history.pop(0)
+            total -= self._tokens(message)
+            self.trimmed.append(message)
+
+    def build_messages(self) -> List[Dict[str, str]]:
+        """Messages to send: system prompt, summary of trimmed turns, recent history."""
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}",
+            })
+        messages.extend(self.history)
+        return messages
+
+    async def summarize(self, client: openai.AsyncOpenAI) -> None:
+        """Fold trimmed turns into the running summary (or drop them if disabled)."""
+        if not self.trimmed:
+            return
+        trimmed, self.trimmed = self.trimmed, []
+        if not SESSION_SUMMARIZE:
+            return
+
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in trimmed)
+        if self.summary:
+            transcript = f"Previous summary: {self.summary}\n{transcript}"
+        try:
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Summarize this real estate conversation in under 100 words. "
+                                   "Keep the client's requirements, budget, locations and any properties discussed.",
+                    },
+                    {"role": "user", "content": transcript},
+                ],
+                temperature=0.0,
+                max_tokens=SUMMARY_MAX_TOKENS,
+            )
+            self.summary = response.choices[0].message.content.strip()
+            self.trim()
+        except Exception as e:
+            # Truncation already kept us within budget; the summary is best effort
+            logger.warning(f"Could not summarize session {self.session_id}: {e}")
+
+
+class SessionStore:
+    """In-memory sessions keyed by id, expired after SESSION_IDLE_TTL of inactivity."""
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, ChatSession] = {}
+
+    def get_or_create(self, session_id: Optional[str] = None, **kwargs) -> ChatSession:
+        """Resume ``session_id`` if it is still alive, otherwise start a new session."""
+        self._expire()
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                # Make room by dropping the least recently active session
+                oldest = min(self.sessions.values(), key=lambda s: s.last_active)
+                del self.sessions[oldest.session_id]
+            session = ChatSession(uuid.uuid4().hex, **kwargs)
+            self.sessions[session.session_id] = session
+        session.last_active = time.time()
+        return session
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.idle_ttl
+        for session_id, session in list(self.sessions.items()):
+            if session.last_active < cutoff:
+                del self.sessions[session_id]
+
+
+# Create a singleton instance
+session_store = SessionStore()
@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")            # memory | sqlite | none
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "temp/llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))              # Seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+# Only responses at or below this temperature are deterministic enough to reuse
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.0"))
+
+
+def normalize_prompt(text: str) -> str:
+    """Case-fold and collapse whitespace/trailing punctuation so trivial variants share a key."""
+    text = re.sub(r"\s+", " ", text.casefold()).strip()
+    return text.rstrip(" ?!.؟")
+
+
+def make_cache_key(
+    user_text: str,
+    system_prompt: Optional[str],
+    model: str,
+    temperature: float,
+    max_tokens: int
+) -> str:
+    payload = json.dumps(
+        [normalize_prompt(user_text), system_prompt or "", model, round(temperature, 3), max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------------------------------
+# Backends
+# --------------------------------------------------------------------
+class CacheBackend(ABC):
+    """Key/value store with TTL and LRU eviction."""
+
+    # Blocking backends are called from a worker thread
+    blocking = False
+
+    def __init__(self, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (value, created_at) or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process in-memory cache."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if time.time() - item[1] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk cache shared by every worker process on the host and kept across restarts."""
+
+    blocking = True
+
+    def __init__(self, path: str = LLM_CACHE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+# --------------------------------------------------------------------
+# Response Cache
+# --------------------------------------------------------------------
+class LLMResponseCache:
+    """
+    Cache of chat completions for repeated prompts.
+
+    Only requests at or below ``max_temperature`` are cached, since sampled
+    responses are not meant to repeat.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend],
+        max_temperature: float = LLM_CACHE_MAX_TEMPERATURE
+    ):
+        self.backend = backend
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return self.backend is not None and temperature <= self.max_temperature
+
+    async def _call(self, func, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (value, age_seconds) on a hit."""
+        try:
+            item = await self._call(self.backend.get, key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            item = None
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value, created_at = item
+        return value, max(0.0, time.time() - created_at)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            await self._call(self.backend.set, key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "max_temperature": self.max_temperature,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_backend(name: str = LLM_CACHE_BACKEND) -> Optional[CacheBackend]:
+    """Build the configured backend; ``none`` disables caching."""
+    name = name.lower()
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "sqlite":
+        return SQLiteCacheBackend()
+    if name not in ("none", "off", ""):
+        logger.warning(f"Unknown LLM_CACHE_BACKEND '{name}', caching disabled")
+    return None
+
+
+# Create a singleton instance
+llm_cache = LLMResponseCache(create_backend())
@@ -1,4 +1,7 @@
 import os
+import json
+import time
+import asyncio
 import logging
 import shutil
 from typing import Union, Optional
@@ -24,24 +27,45 @@ print(f"OPENAI_API_KEY is set: {'Yes' if os.getenv('OPENAI_API_KEY') else 'No'}"
 if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("OPENAI_API_KEY environment variable not set. Please check your .env file.")
 
-from fastapi import FastAPI, HTTPException, status, UploadFile, File, Form, Request
+from fastapi import FastAPI, HTTPException, status, UploadFile, File, Form, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
 # Import TTS service
 from app.tts_service import tts_service
 
+# Import TTS thread pool
+from app.tts_executor import tts_executor
+from app.tts_cache import tts_cache
+from app.llm_cache import llm_cache
+from app.openai_client import open_async_client, close_async_client
+from app.chat_session import session_store
+from app.metrics import metrics
+from app.storage import storage_manager
+from tts.engines import get_tts_engine, close_engines
+
 # Import agent pipeline
 from app.agent_pipeline import (
     generate_ai_response,
     process_user_input,
+    stream_speech_response,
+    stream_chat_response,
+    open_urls_in_browser,
     AIResponse,
     DEFAULT_LANGUAGE,
     SUPPORTED_LANGUAGES
 )
 
+# Import avatar job queue
+from app.avatar_jobs import (
+    avatar_job_queue,
+    AvatarJob,
+    AvatarJobStatus,
+    AvatarQueueFullError,
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -85,6 +109,28 @@ async def add_cors_headers(request: Request, call_next):
         response.headers["Access-Control-Allow-Credentials"] = "true"
     return response
 
+SYSTEM_PROMPT = (
+    "You are a helpful real estate assistant. Provide detailed and accurate information "
+    "about properties, market trends, and answer any real estate related questions."
+)
+
+# Request counters, latency and in-flight gauge for every HTTP request
+@app.middleware("http")
+async def track_request_metrics(request: Request, call_next):
+    metrics.request_started()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep job ids out of the labels
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.request_finished(request.method, route_path, status_code, time.perf_counter() - start)
+
+
 # Request/response models
 class ChatRequest(BaseModel):
     text: str = Field(..., description="User input text")
@@ -96,6 +142,9 @@ class ChatRequest(BaseModel):
         0.7, ge=0.0, le=2.0, description="Sampling temperature (0.0 to 2.0)"
     )
     max_tokens: int = Field(1000, gt=0, description="Maximum number of tokens to generate")
+    use_cache: bool = Field(
+        True, description="Reuse cached answers for repeated prompts (deterministic temperatures only)"
+    )
 
 
 class TTSRequest(BaseModel):
@@ -104,6 +153,18 @@ class TTSRequest(BaseModel):
     )
     language: str = Field(DEFAULT_LANGUAGE, description="Language code (e.g., 'en', 'ar')")
     voice: Optional[str] = Field(None, description="Voice identifier (if supported)")
+    concatenate: bool = Field(
+        False, description="For a list of sentences, also return one joined audio file"
+    )
+
+
+class AvatarRequest(BaseModel):
+    avatar_id: str = Field("default", description="Avatar face to animate")
+    text: Optional[str] = Field(None, description="Text to speak (converted with TTS)")
+    audio_url: Optional[str] = Field(
+        None, description="URL of existing audio under /static/audio/ to use instead of text"
+    )
+    language: str = Field(DEFAULT_LANGUAGE, description="Language code for TTS (e.g., 'en', 'ar')")
 
 
 # Health check endpoint
@@ -119,7 +180,7 @@ async def root():
 
 # Chat endpoint
 @app.post("/api/chat", response_model=AIResponse)
-async def chat(chat_request: ChatRequest):
+async def chat(chat_request: ChatRequest, request: Request, response: Response):
     """
     Process user input and generate AI response with optional TTS and URL handling.
     """
@@ -132,17 +193,25 @@ async def chat(chat_request: ChatRequest):
             )
 
         # Process through the pipeline
-        response = await process_user_input(
+        result = await process_user_input(
             user_text=chat_request.text,
             generate_audio=chat_request.generate_audio,
             open_urls=chat_request.open_urls,
             model=chat_request.model,
             temperature=chat_request.temperature,
             max_tokens=chat_request.max_tokens,
-            system_prompt="You are a helpful real estate assistant. Provide detailed and accurate information about properties, market trends, and answer any real estate related questions.",
+            system_prompt=SYSTEM_PROMPT,
+            use_cache=chat_request.use_cache,
+            client=request.app.state.openai_client,
         )
 
-        return response
+        # Tell clients/proxies whether the text came from the LLM cache
+        if not chat_request.use_cache or not llm_cache.is_cacheable(chat_request.temperature):
+            response.headers["X-Cache"] = "BYPASS"
+        else:
+            response.headers["X-Cache"] = "HIT" if result.get("cached") else "MISS"
+
+        return result
 
     except HTTPException:
         raise
@@ -154,70 +223,324 @@ async def chat(chat_request: ChatRequest):
         )
 
 
+def format_sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# Streaming chat endpoint
+@app.post("/api/chat/stream")
+async def chat_stream(chat_request: ChatRequest, request: Request):
+    """
+    Stream the AI response as Server-Sent Events while it is generated.
+
+    Events: ``token`` (text deltas), ``url`` (each URL once it is complete),
+    ``done`` (full text, URLs and TTS audio of the whole reply) and ``error``.
+    """
+    if chat_request.language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported language. Supported languages: {', '.join(SUPPORTED_LANGUAGES.keys())}",
+        )
+
+    async def event_stream():
+        async for event in stream_chat_response(
+            user_text=chat_request.text,
+            generate_audio=chat_request.generate_audio,
+            language=chat_request.language,
+            use_cache=chat_request.use_cache,
+            model=chat_request.model,
+            temperature=chat_request.temperature,
+            max_tokens=chat_request.max_tokens,
+            system_prompt=SYSTEM_PROMPT,
+            client=request.app.state.openai_client,
+        ):
+            if event["type"] == "done" and chat_request.open_urls and event["urls"]:
+                await open_urls_in_browser(event["urls"])
+            yield format_sse(event.pop("type"), event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Streaming chat + speech endpoint
+@app.post("/api/chat/speech")
+async def chat_speech(chat_request: ChatRequest, request: Request):
+    """
+    Stream the AI response as Server-Sent Events, with one TTS audio segment
+    per sentence as soon as that sentence is complete.
+
+    Events: ``text`` (token deltas), ``audio`` (per-sentence audio URL, in
+    order), ``audio_error``, ``done`` (full text and URLs) and ``error``.
+    """
+    if chat_request.language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported language. Supported languages: {', '.join(SUPPORTED_LANGUAGES.keys())}",
+        )
+
+    async def event_stream():
+        async for event in stream_speech_response(
+            user_text=chat_request.text,
+            language=chat_request.language,
+            model=chat_request.model,
+            temperature=chat_request.temperature,
+            max_tokens=chat_request.max_tokens,
+            system_prompt=SYSTEM_PROMPT,
+            client=request.app.state.openai_client,
+        ):
+            yield format_sse(event.pop("type"), event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Conversational WebSocket session
+@app.websocket("/ws/chat")
+async def chat_session_ws(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Multi-turn chat over one WebSocket with the history kept server-side.
+
+    The server first sends ``{"type": "session", "session_id": ...}``; pass
+    that id as ``?session_id=`` to resume after a reconnect. Each client
+    message is a ChatRequest JSON object and is answered with the same events
+    as /api/chat/speech (or /api/chat/stream when generate_audio is false).
+    """
+    await websocket.accept()
+    session = session_store.get_or_create(session_id, system_prompt=SYSTEM_PROMPT)
+    await websocket.send_json({
+        "type": "session",
+        "session_id": session.session_id,
+        "resumed": session.session_id == session_id,
+    })
+    client = websocket.app.state.openai_client
+
+    try:
+        while True:
+            try:
+                chat_request = ChatRequest(**await websocket.receive_json())
+            except (ValueError, TypeError, ValidationError) as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid request: {e}"})
+                continue
+            if not chat_request.text.strip():
+                await websocket.send_json({"type": "error", "detail": "No text provided"})
+                continue
+            if chat_request.language not in SUPPORTED_LANGUAGES:
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"Unsupported language. Supported languages: {', '.join(SUPPORTED_LANGUAGES.keys())}",
+                })
+                continue
+
+            session.model = chat_request.model
+            session.add_message("user", chat_request.text.strip())
+            kwargs = dict(
+                model=chat_request.model,
+                temperature=chat_request.temperature,
+                max_tokens=chat_request.max_tokens,
+                client=client,
+                messages=session.build_messages(),
+            )
+            if chat_request.generate_audio:
+                events = stream_speech_response(chat_request.text, language=chat_request.language, **kwargs)
+            else:
+                events = stream_chat_response(chat_request.text, generate_audio=False, **kwargs)
+
+            reply = None
+            async for event in events:
+                if event["type"] == "done":
+                    reply = event["text"]
+                await websocket.send_json(event)
+
+            if reply:
+                session.add_message("assistant", reply)
+                await session.summarize(client)
+            elif session.history and session.history[-1]["role"] == "user":
+                # Failed turn: keep the history consistent for the next one
+                session.history.pop()
+
+    except WebSocketDisconnect:
+        logger.info(f"Chat session {session.session_id} disconnected")
+
+
 # Text-to-Speech endpoint
 @app.post("/api/tts")
 async def text_to_speech(tts_request: TTSRequest):
     """
-    Convert text to speech using the pyttsx3 TTS engine.
-    Returns a JSON object with the audio URL.
+    Convert text to speech.
+
+    A single string returns {"audio_url": ...}. A list of sentences is
+    synthesized concurrently and returns {"segments": [...], "failed": n,
+    "audio_url": ...}, where audio_url is the joined file if concatenate is
+    set and every segment succeeded (else null).
     """
     try:
-        logger.info(f"TTS Request - Text: {tts_request.text[:100]}..., Language: {tts_request.language}")
-        
+        is_batch = isinstance(tts_request.text, list)
+        preview = " | ".join(tts_request.text) if is_batch else tts_request.text
+        logger.info(f"TTS Request - Text: {preview[:100]}..., Language: {tts_request.language}")
+
         # Check if text is provided
-        if not tts_request.text or not tts_request.text.strip():
+        if not tts_request.text or (not is_batch and not tts_request.text.strip()):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No text provided for TTS conversion",
             )
-            
-        # Generate TTS audio using the agent pipeline
-        try:
-            from app.agent_pipeline import generate_tts_audio
-            
-            # Generate the audio file - this now returns just the audio_url
-            audio_url = await generate_tts_audio(
-                text=tts_request.text,
+
+        from app.agent_pipeline import generate_tts_audio, synthesize_batch
+
+        if is_batch:
+            result = await synthesize_batch(
+                tts_request.text,
                 language=tts_request.language,
-                voice=tts_request.voice
+                voice=tts_request.voice,
+                concatenate=tts_request.concatenate
             )
-            
-            if not audio_url:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to generate TTS audio file"
-                )
-            
-            # Log the successful generation
-            logger.info(f"TTS audio generated successfully. URL: {audio_url}")
-            
-            # Return a clean JSON response with just the audio URL
-            return {"audio_url": audio_url}
-            
-        except HTTPException:
-            raise
-            
-        except Exception as e:
-            logger.error(f"TTS generation failed: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate TTS audio: {str(e)}",
+            logger.info(
+                f"TTS batch of {len(result['segments'])} sentences generated, {result['failed']} failed"
             )
-        
+            return result
+
+        tts_result = await generate_tts_audio(
+            text=tts_request.text,
+            language=tts_request.language,
+            voice=tts_request.voice
+        )
+        logger.info(f"TTS audio generated successfully. URL: {tts_result['audio_url']}")
+        return {"audio_url": tts_result["audio_url"]}
+
     except HTTPException as he:
         logger.error(f"HTTP Exception in TTS endpoint: {str(he)}")
         raise
-        
+
     except Exception as e:
         error_msg = f"Unexpected error in TTS endpoint: {str(e)}"
         logger.error(error_msg, exc_info=True)
-        
+
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_msg,
         )
 
 
+# Avatar video endpoints
+@app.post("/api/avatar", status_code=status.HTTP_202_ACCEPTED)
+async def create_avatar_job(avatar_request: AvatarRequest):
+    """
+    Queue a lip-synced avatar video job and return its id right away.
+    Poll /api/avatar/{job_id} for the status and fetch the video from
+    /api/avatar/{job_id}/result once it is completed.
+    """
+    audio_path = None
+    if avatar_request.audio_url:
+        # Only audio we serve ourselves is accepted
+        prefix = "/static/audio/"
+        name = avatar_request.audio_url.split("?", 1)[0]
+        if not name.startswith(prefix) or "/" in name[len(prefix):]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"audio_url must point to a file under {prefix}",
+            )
+        audio_path = os.path.join("static/audio", name[len(prefix):])
+        if not os.path.isfile(audio_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio file not found",
+            )
+    elif avatar_request.language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported language. Supported languages: {', '.join(SUPPORTED_LANGUAGES.keys())}",
+        )
+
+    try:
+        job = avatar_job_queue.submit(
+            avatar_id=avatar_request.avatar_id,
+            text=avatar_request.text and avatar_request.text.strip(),
+            audio_path=audio_path,
+            language=avatar_request.language,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except AvatarQueueFullError as e:
+        # Backpressure: tell the client to come back later instead of queueing forever
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": str(e)},
+            headers={"Retry-After": "30"},
+        )
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/api/avatar/{job.job_id}",
+        "result_url": f"/api/avatar/{job.job_id}/result",
+    }
+
+
+@app.get("/api/avatar/{job_id}", response_model=AvatarJob)
+async def get_avatar_job(job_id: str):
+    """Return the current state of an avatar job."""
+    job = avatar_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@app.get("/api/avatar/{job_id}/result")
+async def get_avatar_result(job_id: str):
+    """Return the generated video of a completed avatar job."""
+    job = avatar_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if job.status == AvatarJobStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Avatar job failed: {job.error}",
+        )
+    if job.status != AvatarJobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Avatar job is {job.status.value}",
+        )
+    if not job.video_path or not os.path.isfile(job.video_path):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Video is no longer available")
+    return FileResponse(job.video_path, media_type="video/mp4", filename=f"{job_id}.mp4")
+
+
+# Cache statistics
+@app.get("/api/tts/cache")
+async def tts_cache_stats():
+    """Hit/miss counters and size of the TTS audio cache."""
+    return tts_cache.stats()
+
+
+@app.get("/api/chat/cache")
+async def llm_cache_stats():
+    """Hit/miss counters of the LLM response cache."""
+    return llm_cache.stats()
+
+
+# Storage usage
+@app.get("/api/storage")
+async def storage_stats():
+    """Usage, quotas and eviction counters of generated audio/video."""
+    return storage_manager.stats()
+
+
+# Prometheus metrics
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Pipeline stage timings, request counters and in-flight gauges."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 # API to list supported languages
 @app.get("/api/languages")
 async def list_languages():
@@ -273,3 +596,23 @@ async def startup_event():
     os.makedirs("temp", exist_ok=True)
     os.makedirs("static/audio", exist_ok=True)
     logger.info("Application startup: Created necessary directories")
+    app.state.openai_client = await open_async_client()
+    # TTS cache clips are evicted by the cache itself
+    storage_manager.add_owner(tts_cache.owns)
+    await storage_manager.start()
+    # Load local TTS models before the first request instead of during it
+    await asyncio.to_thread(get_tts_engine().warm_up)
+    await avatar_job_queue.start()
+
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background services on shutdown."""
+    await avatar_job_queue.stop()
+    await storage_manager.stop()
+    await close_async_client()
+    tts_executor.shutdown()
+    tts_cache.save_index()
+    tts_service.shutdown()
+    close_engines()
@@ -0,0 +1,204 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client
+except ImportError:  # Served by the built-in fallback below
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+# Pipeline stages: LLM (full reply and first token), TTS synthesis and the
+# Wav2Lip steps (face detection, generator forward passes, ffmpeg encoding)
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """Add the time spent in the block to ``timings[stage]`` without exporting it."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(timings.get(stage, 0.0) + time.perf_counter() - start, 4)
+
+
+class _FallbackRegistry:
+    """
+    Minimal stand-in for prometheus_client: counters, gauges and histograms
+    (STAGE_BUCKETS) rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.gauges: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], list] = {}   # -> [bucket counts, count, sum]
+        self.help: Dict[str, Tuple[str, str]] = {}
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self.help[name] = (kind, text)
+
+    def inc(self, name: str, labels: Tuple, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0.0) + value
+
+    def add(self, name: str, labels: Tuple, value: float) -> None:
+        with self._lock:
+            self.gauges[(name, labels)] = self.gauges.get((name, labels), 0.0) + value
+
+    def observe(self, name: str, labels: Tuple, value: float) -> None:
+        with self._lock:
+            histogram = self.histograms.setdefault((name, labels), [[0] * len(STAGE_BUCKETS), 0, 0.0])
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def render(self) -> bytes:
+        def fmt(labels: Tuple, le: Optional[str] = None) -> str:
+            if le is not None:
+                labels = labels + (("le", le),)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        lines = []
+        with self._lock:
+            for name, (kind, text) in sorted(self.help.items()):
+                family = f"{name}_total" if kind == "counter" else name
+                lines.append(f"# HELP {family} {text}")
+                lines.append(f"# TYPE {family} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in self.counters.items():
+                        if n == name:
+                            lines.append(f"{name}_total{fmt(labels)} {value}")
+                elif kind == "gauge":
+                    for (n, labels), value in self.gauges.items():
+                        if n == name:
+                            lines.append(f"{name}{fmt(labels)} {value}")
+                else:
+                    for (n, labels), (buckets, count, total) in self.histograms.items():
+                        if n == name:
+                            for bound, bucket_count in zip(STAGE_BUCKETS, buckets):
+                                lines.append(f"{name}_bucket{fmt(labels, str(bound))} {bucket_count}")
+                            lines.append(f"{name}_bucket{fmt(labels, '+Inf')} {count}")
+                            lines.append(f"{name}_count{fmt(labels)} {count}")
+                            lines.append(f"{name}_sum{fmt(labels)} {total}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class Metrics:
+    """Pipeline stage timings, request counters and in-flight gauges."""
+
+    def __init__(self):
+        if prometheus_client is not None:
+            self.stage_seconds = prometheus_client.Histogram(
+                "pipeline_stage_seconds", "Time spent in each pipeline stage",
+                ["stage"], buckets=STAGE_BUCKETS,
+            )
+            self.stage_in_flight = prometheus_client.Gauge(
+                "pipeline_stage_in_flight", "Pipeline stages currently running", ["stage"],
+            )
+            self.stage_errors = prometheus_client.Counter(
+                "pipeline_stage_errors", "Pipeline stages that raised", ["stage"],
+            )
+            self.requests = prometheus_client.Counter(
+                "http_requests", "HTTP requests handled", ["method", "route", "status"],
+            )
+            self.request_seconds = prometheus_client.Histogram(
+                "http_request_duration_seconds", "HTTP request latency", ["route"],
+                buckets=STAGE_BUCKETS,
+            )
+            self.requests_in_flight = prometheus_client.Gauge(
+                "http_requests_in_flight", "HTTP requests currently being handled",
+            )
+            self._fallback = None
+        else:
+            self._fallback = _FallbackRegistry()
+            self._fallback.describe("pipeline_stage_seconds", "histogram", "Time spent in each pipeline stage")
+            self._fallback.describe("pipeline_stage_in_flight", "gauge", "Pipeline stages currently running")
+            self._fallback.describe("pipeline_stage_errors", "counter", "Pipeline stages that raised")
+            self._fallback.describe("http_requests", "counter", "HTTP requests handled")
+            self._fallback.describe("http_request_duration_seconds", "histogram", "HTTP request latency")
+            self._fallback.describe("http_requests_in_flight", "gauge", "HTTP requests currently being handled")
+
+    # ----------------------------------------------------------------
+    # Pipeline stages
+    # ----------------------------------------------------------------
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        if self._fallback is None:
+            self.stage_seconds.labels(stage).observe(seconds)
+        else:
+            self._fallback.observe("pipeline_stage_seconds", (("stage", stage),), seconds)
+
+    def _stage_in_flight(self, stage: str, delta: int) -> None:
+        if self._fallback is None:
+            self.stage_in_flight.labels(stage).inc(delta)
+        else:
+            self._fallback.add("pipeline_stage_in_flight", (("stage", stage),), delta)
+
+    @contextmanager
+    def stage(self, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """
+        Time a pipeline stage.
+
+        Args:
+            stage: Stage name (e.g. 'llm', 'tts')
+            timings: Optional dict the duration is also added to, in seconds
+        """
+        self._stage_in_flight(stage, 1)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if self._fallback is None:
+                self.stage_errors.labels(stage).inc()
+            else:
+                self._fallback.inc("pipeline_stage_errors", (("stage", stage),))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stage_in_flight(stage, -1)
+            self.observe_stage(stage, elapsed)
+            if timings is not None:
+                timings[stage] = round(timings.get(stage, 0.0) + elapsed, 4)
+
+    # ----------------------------------------------------------------
+    # HTTP requests
+    # ----------------------------------------------------------------
+    def request_started(self) -> None:
+        if self._fallback is None:
+            self.requests_in_flight.inc()
+        else:
+            self._fallback.add("http_requests_in_flight", (), 1)
+
+    def request_finished(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        if self._fallback is None:
+            self.requests_in_flight.dec()
+            self.requests.labels(method, route, str(status_code)).inc()
+            self.request_seconds.labels(route).observe(seconds)
+        else:
+            self._fallback.add("http_requests_in_flight", (), -1)
+            self._fallback.inc(
+                "http_requests", (("method", method), ("route", route), ("status", str(status_code)))
+            )
+            self._fallback.observe("http_request_duration_seconds", (("route", route),), seconds)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Return the exposition body and its content type."""
+        if self._fallback is None:
+            return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+        return self._fallback.render(), CONTENT_TYPE
+
+
+# Create a singleton instance
+metrics = Metrics()
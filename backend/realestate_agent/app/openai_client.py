@@ -0,0 +1,96 @@
+import os
+import logging
+import threading
+from typing import Optional
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+# One client (and so one HTTP connection pool) per process instead of a new
+# pool and TLS handshake per request.
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # Seconds idle before closing
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+_async_client: Optional[openai.AsyncOpenAI] = None
+_sync_client: Optional[openai.OpenAI] = None
+_sync_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def _api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OpenAI API key not found in environment variables")
+    return api_key
+
+
+def create_async_client() -> openai.AsyncOpenAI:
+    """Build an async client with a tuned, keep-alive connection pool."""
+    return openai.AsyncOpenAI(
+        api_key=_api_key(),
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+    )
+
+
+async def open_async_client() -> openai.AsyncOpenAI:
+    """Create the process-wide async client (FastAPI startup)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+        logger.info(
+            f"OpenAI client ready (max_connections={OPENAI_MAX_CONNECTIONS}, "
+            f"keepalive={OPENAI_MAX_KEEPALIVE})"
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the process-wide async client and its connections (FastAPI shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+        logger.info("OpenAI client closed")
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """Return the shared async client, creating it if the app hook has not run."""
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
+
+
+def get_sync_client() -> openai.OpenAI:
+    """Return the shared blocking client used by the CLIs."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = openai.OpenAI(
+                api_key=_api_key(),
+                max_retries=OPENAI_MAX_RETRIES,
+                http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+            )
+        return _sync_client
@@ -0,0 +1,236 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+STORAGE_AUDIO_QUOTA_MB = float(os.getenv("STORAGE_AUDIO_QUOTA_MB", "1024"))
+STORAGE_AUDIO_TTL_HOURS = float(os.getenv("STORAGE_AUDIO_TTL_HOURS", "24"))
+STORAGE_VIDEO_QUOTA_MB = float(os.getenv("STORAGE_VIDEO_QUOTA_MB", "4096"))
+STORAGE_VIDEO_TTL_HOURS = float(os.getenv("STORAGE_VIDEO_TTL_HOURS", "24"))
+STORAGE_GC_INTERVAL = float(os.getenv("STORAGE_GC_INTERVAL", "300"))          # Seconds between GC passes
+STORAGE_RESCAN_INTERVAL = float(os.getenv("STORAGE_RESCAN_INTERVAL", "3600"))  # Seconds between full rescans
+MIN_FILE_AGE = 60  # Never touch files younger than this (may still be being written or fetched)
+TMP_FILE_MAX_AGE = float(os.getenv("STORAGE_TMP_MAX_AGE", "3600"))  # Dot-prefixed temp files older than this are orphans
+
+
+class StorageArea:
+    """A directory of generated files with its own quota and TTL."""
+
+    def __init__(self, name: str, directory: str, quota_bytes: int, ttl_seconds: float):
+        self.name = name
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.files: Dict[str, Tuple[int, float]] = {}   # filename -> (size, mtime)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(size for size, _ in self.files.values())
+
+
+class StorageManager:
+    """
+    Lifecycle manager for generated audio and video.
+
+    Each area keeps an index of its files, built by one ``os.scandir`` pass at
+    startup and then updated as files are registered. A background task
+    deletes files past their TTL and, when an area is over quota, the oldest
+    files first. Files that are pinned (in use by a running job) or owned by
+    a cache (which does its own eviction) are never deleted here.
+    """
+
+    def __init__(self, areas: List[StorageArea], interval: float = STORAGE_GC_INTERVAL):
+        self.areas = {area.name: area for area in areas}
+        self.interval = interval
+        self._owners: List[Callable[[str], bool]] = []
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_scan = 0.0
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+
+    # ----------------------------------------------------------------
+    # References
+    # ----------------------------------------------------------------
+    def add_owner(self, owns: Callable[[str], bool]) -> None:
+        """Register a check telling whether another component manages a file path."""
+        self._owners.append(owns)
+
+    def pin(self, path: str) -> None:
+        """Protect a file from eviction until it is unpinned."""
+        key = os.path.abspath(path)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, path: str) -> None:
+        key = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    def is_pinned(self, path: str) -> bool:
+        return os.path.abspath(path) in self._pins
+
+    def _is_referenced(self, path: str) -> bool:
+        if self.is_pinned(path):
+            return True
+        return any(owns(path) for owns in self._owners)
+
+    # ----------------------------------------------------------------
+    # Index
+    # ----------------------------------------------------------------
+    def _area_for(self, path: str) -> Optional[StorageArea]:
+        directory = os.path.dirname(os.path.abspath(path))
+        for area in self.areas.values():
+            if os.path.abspath(area.directory) == directory:
+                return area
+        return None
+
+    def register(self, path: str) -> None:
+        """Add a newly written file to the index of its area."""
+        area = self._area_for(path)
+        if area is None:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            area.files[os.path.basename(path)] = (stat.st_size, stat.st_mtime)
+
+    def scan(self) -> None:
+        """Rebuild every area's index with a single directory pass each."""
+        for area in self.areas.values():
+            os.makedirs(area.directory, exist_ok=True)
+            files = {}
+            with os.scandir(area.directory) as entries:
+                for entry in entries:
+                    # Dotfiles are temp files; indexed so that orphaned ones get collected
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    files[entry.name] = (stat.st_size, stat.st_mtime)
+            with self._lock:
+                area.files = files
+            logger.info(f"Storage '{area.name}': {len(files)} files, {area.used_bytes / 1e6:.1f} MB")
+        self._last_scan = time.time()
+
+    # ----------------------------------------------------------------
+    # Garbage collection
+    # ----------------------------------------------------------------
+    def collect(self) -> int:
+        """Run one eviction pass over every area; returns the number of files deleted."""
+        if time.time() - self._last_scan > STORAGE_RESCAN_INTERVAL:
+            # Picks up files written by code that does not register them
+            self.scan()
+
+        deleted = 0
+        now = time.time()
+        for area in self.areas.values():
+            with self._lock:
+                candidates = sorted(area.files.items(), key=lambda item: item[1][1])  # Oldest first
+                used = area.used_bytes
+
+            for filename, (size, mtime) in candidates:
+                age = now - mtime
+                if filename.startswith("."):
+                    # In-progress temp file, or left behind by a writer that timed out
+                    expired = age > min(TMP_FILE_MAX_AGE, area.ttl_seconds)
+                    if not expired:
+                        continue
+                else:
+                    expired = age > area.ttl_seconds
+                if not expired and used <= area.quota_bytes:
+                    # Everything after this is newer, so it is neither expired nor needed for the quota
+                    break
+                path = os.path.join(area.directory, filename)
+                if age < MIN_FILE_AGE or self._is_referenced(path):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not delete {path}: {e}")
+                    continue
+                with self._lock:
+                    area.files.pop(filename, None)
+                used -= size
+                deleted += 1
+                self.deleted_files += 1
+                self.deleted_bytes += size
+
+            if used > area.quota_bytes:
+                logger.warning(
+                    f"Storage '{area.name}' still over quota ({used / 1e6:.1f} MB) "
+                    "after eviction; remaining files are recent or referenced"
+                )
+        if deleted:
+            logger.info(f"Storage GC deleted {deleted} files")
+        return deleted
+
+    async def start(self) -> None:
+        """Scan the storage areas and start the background GC task."""
+        await asyncio.to_thread(self.scan)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                logger.error(f"Storage GC failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            areas = {
+                area.name: {
+                    "files": len(area.files),
+                    "bytes": area.used_bytes,
+                    "quota_bytes": area.quota_bytes,
+                    "ttl_seconds": area.ttl_seconds,
+                }
+                for area in self.areas.values()
+            }
+            pinned = len(self._pins)
+        return {
+            "areas": areas,
+            "pinned": pinned,
+            "deleted_files": self.deleted_files,
+            "deleted_bytes": self.deleted_bytes,
+        }
+
+
+# Create a singleton instance
+storage_manager = StorageManager([
+    StorageArea(
+        name="audio",
+        directory="static/audio",
+        quota_bytes=int(STORAGE_AUDIO_QUOTA_MB * 1024 * 1024),
+        ttl_seconds=STORAGE_AUDIO_TTL_HOURS * 3600,
+    ),
+    StorageArea(
+        name="video",
+        directory="static/video",
+        quota_bytes=int(STORAGE_VIDEO_QUOTA_MB * 1024 * 1024),
+        ttl_seconds=STORAGE_VIDEO_TTL_HOURS * 3600,
+    ),
+])
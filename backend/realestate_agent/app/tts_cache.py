@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.storage import storage_manager
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "512"))
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "5000"))
+TTS_CACHE_DIR = "static/audio"                 # Cached clips are served like any other TTS output
+TTS_CACHE_INDEX = "temp/tts_cache.json"        # Kept out of the static mount
+CACHE_FILE_PREFIX = "tts_"
+INDEX_SAVE_DELAY = 5.0  # Seconds to batch index changes before writing them
+
+
+def make_cache_key(
+    text: str,
+    language: str,
+    voice: Optional[str] = None,
+    speed: float = 1.0,
+    engine: str = "gtts",
+    extension: str = "wav"
+) -> str:
+    """Hash everything that changes the synthesized audio, including its file format."""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    payload = json.dumps([normalized, language, voice, round(speed, 3), engine, extension], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    Clips are stored as ``tts_<key>.<ext>`` next to the other TTS output, so a
+    hit is just the existing URL. An LRU index (key -> file, size) lives in
+    memory and is persisted to disk, and the least recently used clips are
+    deleted once the entry or byte budget is exceeded. Concurrent misses for
+    the same key share a single synthesis.
+    """
+
+    def __init__(
+        self,
+        directory: str = TTS_CACHE_DIR,
+        index_path: str = TTS_CACHE_INDEX,
+        max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024),
+        max_entries: int = TTS_CACHE_MAX_ENTRIES,
+        enabled: bool = TTS_CACHE_ENABLED
+    ):
+        self.directory = directory
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        if self.enabled:
+            self._load_index()
+
+    # ----------------------------------------------------------------
+    # Lookup
+    # ----------------------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path for ``key`` or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        path = os.path.join(self.directory, entry["filename"])
+        if not os.path.exists(path):
+            # Deleted behind our back
+            self._drop(key, delete_file=False)
+            return None
+        entry["last_access"] = time.time()
+        self.entries.move_to_end(key)
+        self._dirty = True
+        return path
+
+    def owns(self, path: str) -> bool:
+        """Whether ``path`` is a clip this cache still indexes (and evicts itself)."""
+        name = os.path.basename(path)
+        if not name.startswith(CACHE_FILE_PREFIX):
+            return False
+        return name[len(CACHE_FILE_PREFIX):].split(".", 1)[0] in self.entries
+
+    async def get_or_create(
+        self,
+        key: str,
+        create: Callable[[str], Awaitable[Optional[str]]],
+        extension: str = "wav"
+    ) -> Tuple[str, bool]:
+        """
+        Return the cached clip for ``key``, synthesizing it on a miss.
+
+        Args:
+            key: Cache key from ``make_cache_key``
+            create: Coroutine function that writes audio to the given path
+                and returns that path (or None on failure)
+            extension: File extension of the clip
+
+        Returns:
+            Tuple: (audio_path, cache_hit)
+        """
+        if not self.enabled:
+            path = os.path.join(self.directory, f"{CACHE_FILE_PREFIX}{uuid.uuid4().hex}.{extension}")
+            return await self._create(create, path), False
+
+        path = self.get(key)
+        if path is not None:
+            self.hits += 1
+            return path, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.hits += 1
+            return await asyncio.shield(task), True
+
+        self.misses += 1
+        # The synthesis runs as its own task: if the caller that started it is
+        # cancelled (client went away), it still completes for the other
+        # waiters and fills the cache
+        task = asyncio.create_task(self._fill(key, create, extension))
+        # Nobody may be left waiting; do not warn about an unretrieved exception
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return await asyncio.shield(task), False
+
+    async def _fill(
+        self,
+        key: str,
+        create: Callable[[str], Awaitable[Optional[str]]],
+        extension: str
+    ) -> str:
+        try:
+            filename = f"{CACHE_FILE_PREFIX}{key}.{extension}"
+            path = os.path.join(self.directory, filename)
+            tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp.{extension}")
+            try:
+                await self._create(create, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._add(key, filename, os.path.getsize(path))
+            return path
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    async def _create(create: Callable[[str], Awaitable[Optional[str]]], path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        result = await create(path)
+        if not result or not os.path.exists(path) or os.path.getsize(path) == 0:
+            raise RuntimeError("TTS engine produced no audio")
+        return path
+
+    # ----------------------------------------------------------------
+    # Bookkeeping
+    # ----------------------------------------------------------------
+    def _add(self, key: str, filename: str, size: int) -> None:
+        if key in self.entries:
+            self._drop(key, delete_file=False)
+        self.entries[key] = {"filename": filename, "size": size, "last_access": time.time()}
+        self.total_bytes += size
+        self._evict(keep=key)
+        self._dirty = True
+        self._schedule_save()
+
+    def _drop(self, key: str, delete_file: bool = True) -> None:
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["size"]
+        self._dirty = True
+        if delete_file:
+            try:
+                os.remove(os.path.join(self.directory, entry["filename"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete cached audio {entry['filename']}: {e}")
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used clips until both budgets are met (never ``keep``)."""
+        for key in list(self.entries):
+            if len(self.entries) <= self.max_entries and self.total_bytes <= self.max_bytes:
+                break
+            # Clips pinned by a queued or running avatar job stay until it is done
+            if key == keep or storage_manager.is_pinned(os.path.join(self.directory, self.entries[key]["filename"])):
+                continue
+            self._drop(key)
+            self.evictions += 1
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable TTS cache index {self.index_path}: {e}")
+            return
+
+        # Saved oldest-first, so the LRU order survives restarts
+        for key, entry in saved.get("entries", []):
+            path = os.path.join(self.directory, entry["filename"])
+            if os.path.exists(path):
+                entry["size"] = os.path.getsize(path)
+                self.entries[key] = entry
+                self.total_bytes += entry["size"]
+        self._evict()
+        logger.info(f"TTS cache loaded: {len(self.entries)} clips, {self.total_bytes / 1e6:.1f} MB")
+
+    def _schedule_save(self) -> None:
+        """Write the index a few seconds from now, batching the changes in between."""
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(INDEX_SAVE_DELAY)
+        if not self._dirty:
+            return
+        # Snapshot on the loop, write the file in a thread
+        snapshot = self._snapshot()
+        self._dirty = False
+        if not await asyncio.to_thread(self._write_index, snapshot):
+            self._dirty = True
+
+    def _snapshot(self) -> list:
+        return [(key, dict(entry)) for key, entry in self.entries.items()]
+
+    def _write_index(self, entries: list) -> bool:
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.index_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not save TTS cache index: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def save_index(self) -> None:
+        """Persist the index now if it changed (used at shutdown)."""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        if not self.enabled or not self._dirty:
+            return
+        if self._write_index(self._snapshot()):
+            self._dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Create a singleton instance
+tts_cache = TTSCache()
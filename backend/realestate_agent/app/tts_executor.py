@@ -0,0 +1,116 @@
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------
+# Constants & Configs
+# --------------------------------------------------------------------
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))         # Concurrent blocking TTS calls
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "30"))      # Seconds a running TTS call may take
+TTS_MAX_QUEUED = int(os.getenv("TTS_MAX_QUEUED", "256"))  # Calls waiting for a worker before we push back
+
+
+class TTSExecutor:
+    """
+    Dedicated thread pool for blocking TTS engines (gTTS HTTP round trips,
+    file writes), so synthesis never runs on the event loop and concurrent
+    requests are not serialized behind it.
+
+    A call only reaches the pool once a worker is free, so the timeout covers
+    the synthesis itself and never time spent waiting behind other calls.
+    Waiting is backpressure: beyond ``max_queued`` waiters calls get a 503.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = TTS_WORKERS,
+        timeout: float = TTS_TIMEOUT,
+        max_queued: int = TTS_MAX_QUEUED
+    ):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self.waiting = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="tts"
+            )
+        return self._executor
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Run a blocking TTS call in the pool and wait for it without blocking the loop.
+
+        Args:
+            func: Blocking callable to run
+            timeout: Seconds the call may run once started (defaults to TTS_TIMEOUT)
+
+        Returns:
+            Whatever ``func`` returns
+
+        Raises:
+            HTTPException: 503 if too many calls are waiting for a worker,
+                504 if the call does not finish in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        slots = self._slots
+
+        if self.waiting >= self.max_queued:
+            raise HTTPException(status_code=503, detail="TTS is overloaded, try again later")
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        def release(_) -> None:
+            # The slot is held until the thread is really free, also after a timeout
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # Loop already closed (shutdown)
+
+        try:
+            job = self.executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            slots.release()
+            raise
+        job.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+        except asyncio.TimeoutError:
+            # The worker thread cannot be interrupted; it is freed once the
+            # engine call returns, the caller just stops waiting for it.
+            error_msg = f"TTS timed out after {timeout:.0f}s"
+            logger.error(error_msg)
+            raise HTTPException(status_code=504, detail=error_msg)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Create a singleton instance
+tts_executor = TTSExecutor()
@@ -3,20 +3,33 @@ import tempfile
 import pyttsx3
 import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
 from fastapi import HTTPException
 import logging
 from datetime import datetime
 
+from app.tts_executor import TTS_TIMEOUT
+from app.storage import storage_manager
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TTSService:
-    def __init__(self):
+    """
+    pyttsx3 text-to-speech.
+
+    The pyttsx3 engine is not thread-safe, so it is created and used only on
+    one owner thread: every engine call is submitted to a single-worker
+    executor and callers wait on the result.
+    """
+
+    def __init__(self, timeout: float = TTS_TIMEOUT):
         self.engine = None
-        self.initialize_engine()
-        self.audio_dir = Path("audio_output")
-        self.audio_dir.mkdir(exist_ok=True)
+        self.timeout = timeout
+        self._owner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+        self._owner.submit(self.initialize_engine)
     
     def initialize_engine(self):
         """Initialize the TTS engine with preferred settings."""
@@ -52,12 +65,14 @@ class TTSService:
             self.engine = None
             return False
     
-    def text_to_speech(self, text: str) -> tuple[str, str]:
+    def text_to_speech(self, text: str, timeout: Optional[float] = None) -> tuple[str, str]:
         """
         Convert text to speech and return the path and URL to the generated audio file.
+        Blocks the calling thread; from coroutines, run it via ``tts_executor``.
         
         Args:
             text: The text to convert to speech
+            timeout: Seconds to wait for the engine (defaults to TTS_TIMEOUT)
             
         Returns:
             tuple: (audio_path, audio_url)
@@ -65,7 +80,19 @@ class TTSService:
         if not text or not text.strip():
             logger.warning("No text provided for TTS")
             raise ValueError("No text provided for TTS")
-        
+
+        future = self._owner.submit(self._synthesize, text)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            raise HTTPException(status_code=504, detail="TTS timed out")
+
+    def shutdown(self) -> None:
+        """Stop the owner thread once queued work is done."""
+        self._owner.shutdown(wait=False)
+
+    def _synthesize(self, text: str) -> tuple[str, str]:
+        """Run the engine; only ever called on the owner thread."""
         # Ensure the engine is initialized
         if not self.engine and not self.initialize_engine():
             error_msg = "TTS engine initialization failed"
@@ -105,6 +132,8 @@ class TTSService:
                 logger.error(error_msg)
                 raise Exception(error_msg)
                 
+            storage_manager.register(str(output_path))
+
             # Generate URL for the audio file
             audio_url = f"/static/audio/{filename}"
             logger.info(f"Successfully generated speech file at: {output_path} (Size: {file_size} bytes, URL: {audio_url})")
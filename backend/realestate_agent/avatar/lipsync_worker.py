@@ -0,0 +1,106 @@
+"""
+Long-lived Wav2Lip lip-sync worker.
+
+Keeps the Wav2Lip generator and the s3fd face detector resident in memory so
+that each (face, audio) job only pays for the forward passes instead of a
+container start, imports and two checkpoint loads.
+"""
+import os
+import sys
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Wav2Lip is a flat script directory (``import audio``, ``import models`` ...),
+# so it has to be importable as a top-level path.
+WAV2LIP_DIR = Path(__file__).resolve().parent.parent / "Wav2Lip"
+# Same checkpoint the CLI and the Wav2Lip scripts use; override with WAV2LIP_CHECKPOINT
+DEFAULT_CHECKPOINT = os.getenv("WAV2LIP_CHECKPOINT", str(WAV2LIP_DIR / "wav2lip.pth"))
+
+
+def _import_inference():
+    """Import Wav2Lip's inference module with the Wav2Lip dir on sys.path."""
+    wav2lip_dir = str(WAV2LIP_DIR)
+    if wav2lip_dir not in sys.path:
+        sys.path.insert(0, wav2lip_dir)
+    import inference
+    return inference
+
+
+class LipSyncWorker:
+    """Resident Wav2Lip model + face detector that accepts (face, audio) jobs."""
+
+    def __init__(self, checkpoint_path: str = DEFAULT_CHECKPOINT):
+        self.checkpoint_path = checkpoint_path
+        self._inference = _import_inference()
+        # Jobs share one model and one detector; run them one at a time so the
+        # forward passes do not fight over the same device.
+        self._lock = threading.Lock()
+
+        logger.info(f"Loading Wav2Lip checkpoint from {checkpoint_path}")
+        self.model = self._inference.load_model(checkpoint_path)
+        logger.info("Loading s3fd face detector")
+        self.detector = self._inference.load_detector()
+        logger.info(f"Lip-sync worker ready on {self._inference.device}")
+
+    def generate(
+        self,
+        face: str,
+        audio: str,
+        outfile: str,
+        *extra_args: str,
+        workdir: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> str:
+        """
+        Generate a lip-synced video.
+
+        Args:
+            face: Path to the avatar image or source video
+            audio: Path to the speech audio
+            outfile: Path of the resulting mp4
+            extra_args: Additional ``inference.py`` command line flags
+            workdir: Directory for the job's temporary files (a fresh one
+                under Wav2Lip/temp/ is used and removed if not given)
+            timings: Optional dict that receives the seconds spent in face
+                detection, the Wav2Lip forward passes and encoding
+
+        Returns:
+            Path to the generated video
+        """
+        if not os.path.isfile(face):
+            raise FileNotFoundError(f"Face file not found: {face}")
+        if not os.path.isfile(audio):
+            raise FileNotFoundError(f"Audio file not found: {audio}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(outfile)), exist_ok=True)
+        args = self._inference.parse_args([
+            "--checkpoint_path", self.checkpoint_path,
+            "--face", face,
+            "--audio", audio,
+            "--outfile", outfile,
+            *(["--workdir", workdir] if workdir else []),
+            *extra_args,
+        ])
+
+        with self._lock:
+            logger.info(f"Lip-sync job: face={face} audio={audio} -> {outfile}")
+            return self._inference.run(
+                args, model=self.model, detector=self.detector, timings=timings
+            )
+
+
+_worker: Optional[LipSyncWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_lipsync_worker(checkpoint_path: str = DEFAULT_CHECKPOINT) -> LipSyncWorker:
+    """Return the process-wide worker, loading the models on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = LipSyncWorker(checkpoint_path)
+        return _worker
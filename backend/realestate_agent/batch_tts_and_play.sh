@@ -1,9 +1,9 @@
 #!/bin/bash
+# Synthesize all lines in one process, then play them in order
+python -m tts.batch input.txt --engine coqui --out-pattern "input_{n}.wav" || exit 1
 n=0
 while IFS= read -r line; do
   if [ -n "$line" ]; then
-    tts --text "$line" --model_name tts_models/en/ljspeech/glow-tts --out_path "input_$n.wav"
-    echo "Generated input_$n.wav for: $line"
     aplay "input_$n.wav"
     n=$((n+1))
   fi
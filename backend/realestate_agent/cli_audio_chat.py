@@ -12,11 +12,13 @@ import requests
 import subprocess
 from dotenv import load_dotenv
 import openai
+from app.openai_client import get_sync_client
 
 load_dotenv()
 
 def call_openai_llm(prompt, api_key=None, model="gpt-3.5-turbo"):
-    client = openai.OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    # The shared client keeps its connection pool across calls
+    client = openai.OpenAI(api_key=api_key) if api_key else get_sync_client()
     response = client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
@@ -5,24 +5,33 @@ Simple CLI script for Text-to-Avatar pipeline:
 - TTS generates audio
 - Wav2Lip generates video
 - Output video path is shown
+
+The Wav2Lip model and face detector are loaded once and stay resident for
+every reply of the session. Pass --docker to use the old one-container-per-
+reply path instead.
 """
 
 # Load environment variables from .env
 import os
 import sys
 import time
+import uuid
+import shutil
+import argparse
 import subprocess
 import requests
 from dotenv import load_dotenv
 import openai
+from app.openai_client import get_sync_client
+from avatar.lipsync_worker import DEFAULT_CHECKPOINT
 load_dotenv()
 
 # === LLM Backend Selection ===
 
 # Updated for openai>=1.0.0
 def call_openai_llm(prompt, api_key=None, model="gpt-3.5-turbo"):
-    import openai
-    client = openai.OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    # The shared client keeps its connection pool across calls
+    client = openai.OpenAI(api_key=api_key) if api_key else get_sync_client()
     response = client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
@@ -40,15 +49,12 @@ def call_llm(prompt, use_openai=True, **kwargs):
 TTS_SCRIPT = "batch_tts.sh"  # Your TTS batch script
 FACE_IMAGE = "face.jpg"  # Path to your avatar image (relative to Wav2Lip dir)
 WAV2LIP_INFER_PATH = "inference.py"  # Path inside Wav2Lip dir
-WAV2LIP_CHECKPOINT = "wav2lip.pth"  # Path inside Wav2Lip dir
 WAV2LIP_DIR = "Wav2Lip"
+WAV2LIP_CHECKPOINT = os.path.relpath(DEFAULT_CHECKPOINT, os.path.abspath(WAV2LIP_DIR))  # Path inside Wav2Lip dir
 OUTPUT_DIR = os.path.join(WAV2LIP_DIR, "results")  # Where output videos are saved
 
-# Generate a unique base name for this run
-timestamp = time.strftime("%Y%m%d_%H%M%S")
-base_name = f"avatar_{timestamp}"
-
-def get_wav2lip_docker_cmd():
+def get_wav2lip_docker_cmd(audio_path, outfile):
+    """Docker command for one job; paths are relative to the Wav2Lip dir."""
     return [
         "docker", "run", "--rm",
         "-v", f"{os.path.abspath(WAV2LIP_DIR)}/:/workspace",
@@ -56,16 +62,38 @@ def get_wav2lip_docker_cmd():
         "python3", WAV2LIP_INFER_PATH,
         "--checkpoint_path", WAV2LIP_CHECKPOINT,
         "--face", FACE_IMAGE,
-        "--audio", "tts_output.wav"
+        "--audio", audio_path,
+        "--outfile", outfile,
     ]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Text-to-Avatar CLI")
+    parser.add_argument("--docker", action="store_true",
+                        help="Run Wav2Lip in a fresh docker container per reply")
+    cli_args = parser.parse_args()
+
+    worker = None
+    if not cli_args.docker:
+        from avatar.lipsync_worker import get_lipsync_worker
+        worker = get_lipsync_worker(DEFAULT_CHECKPOINT)
+
     print("=== AI Avatar CLI ===")
-    user_text = input("You: ").strip()
-    if not user_text:
-        print("No input provided. Exiting.")
-        return
+    while True:
+        user_text = input("You: ").strip()
+        if not user_text:
+            print("No input provided. Exiting.")
+            return
+        respond(user_text, worker)
+
+
+def respond(user_text, worker=None):
+    # Every reply gets its own job id, so that replies (and several CLI
+    # sessions on one machine) never share a file
+    job_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    base_name = f"avatar_{job_id}"
+    job_dir = os.path.join(WAV2LIP_DIR, "temp", base_name)
+    os.makedirs(job_dir, exist_ok=True)
 
     # Get AI response from OpenAI (default) or Ollama (set use_openai=False)
     ai_response = call_llm(user_text, use_openai=True)
@@ -77,63 +105,58 @@ def main():
     # Call FastAPI TTS endpoint to generate audio
     print("[1/3] Generating speech audio with TTS (FastAPI)...")
     tts_api_url = "http://localhost:8000/agent/tts"
-    tts_wav_name = f"tts_output_{base_name}.wav"
+    tts_wav_path = os.path.join(job_dir, "tts_output.wav")
     try:
         response = requests.post(tts_api_url, data={"text": tts_text})
         response.raise_for_status()
         # Save the returned audio content
-        with open(tts_wav_name, "wb") as f:
+        with open(tts_wav_path, "wb") as f:
             f.write(response.content)
     except Exception as e:
         print(f"TTS API call failed: {e}")
         sys.exit(1)
 
-    # Copy generated wav to Wav2Lip dir as input for Docker
-    tts_wav_dst = os.path.join(WAV2LIP_DIR, f"tts_output.wav")
-    if os.path.exists(tts_wav_name):
-        import shutil
-        shutil.copy(tts_wav_name, tts_wav_dst)
-    else:
-        print(f"Error: TTS output wav '{tts_wav_name}' not found. Check TTS API output.")
-        sys.exit(1)
-
-
-    # Ensure face image exists before running Docker
+    # Ensure face image exists before running Wav2Lip
     face_path = os.path.join(WAV2LIP_DIR, FACE_IMAGE)
     if not os.path.exists(face_path):
         print(f"Error: Face image '{face_path}' not found. Please check the path.")
         sys.exit(1)
 
-    # Ensure results directory exists before running Docker
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-
-    # Copy tts_output.wav to Wav2Lip dir for Docker
-    tts_wav_src = "tts_output.wav"
-    tts_wav_dst = os.path.join(WAV2LIP_DIR, "tts_output.wav")
-    if os.path.exists(tts_wav_src):
-        import shutil
-        shutil.copy(tts_wav_src, tts_wav_dst)
-
-    print("[2/3] Generating talking video with Wav2Lip (Docker)...")
-    # Remove old result_voice.mp4 if exists to avoid confusion
-    result_voice_path = os.path.join(OUTPUT_DIR, "result_voice.mp4")
-    if os.path.exists(result_voice_path):
-        os.remove(result_voice_path)
-
-    wav2lip_result = subprocess.run(get_wav2lip_docker_cmd(), cwd=WAV2LIP_DIR, capture_output=True)
-    if wav2lip_result.returncode != 0:
-        print("Wav2Lip failed:", wav2lip_result.stderr.decode())
-        sys.exit(1)
-
-    # Rename the generated video to a unique name
-    if os.path.exists(result_voice_path):
-        unique_video_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
-        os.rename(result_voice_path, unique_video_path)
-        print(f"[3/3] Done! Video saved at: {unique_video_path}")
-        print("Play it with: mpv", unique_video_path)
+    # Ensure results directory exists before running Wav2Lip
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    video_path = os.path.join(OUTPUT_DIR, f"{base_name}.mp4")
+
+    if worker is not None:
+        print("[2/3] Generating talking video with Wav2Lip (resident worker)...")
+        try:
+            worker.generate(face_path, os.path.abspath(tts_wav_path), video_path,
+                            workdir=os.path.abspath(job_dir))
+        except Exception as e:
+            print("Wav2Lip failed:", e)
+            print(f"Job files kept in '{job_dir}'.")
+            return
+    else:
+        print("[2/3] Generating talking video with Wav2Lip (Docker)...")
+        wav2lip_result = subprocess.run(
+            get_wav2lip_docker_cmd(
+                os.path.relpath(tts_wav_path, WAV2LIP_DIR),
+                os.path.relpath(video_path, WAV2LIP_DIR),
+            ),
+            cwd=WAV2LIP_DIR,
+            capture_output=True,
+        )
+        if wav2lip_result.returncode != 0:
+            print("Wav2Lip failed:", wav2lip_result.stderr.decode())
+            print(f"Job files kept in '{job_dir}'.")
+            sys.exit(1)
+
+    shutil.rmtree(job_dir, ignore_errors=True)
+
+    if os.path.exists(video_path):
+        print(f"[3/3] Done! Video saved at: {video_path}")
+        print("Play it with: mpv", video_path)
     else:
-        print(f"No video output found in '{OUTPUT_DIR}'.")
+        print(f"No video output found at '{video_path}'.")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Bulk narration of property listings: TTS, optionally followed by Wav2Lip.
+
+Reads a manifest (CSV with a header, or JSONL) with one listing per row:
+    id, text, [language], [voice], [avatar_id]
+
+Listings are rendered by a pool of worker processes, each of which loads the
+TTS engine (and the Wav2Lip model with --video) once. Outputs are named by the
+hash of their inputs, so listings whose audio/video already exist are skipped.
+Every finished listing is appended to a checkpoint file, so an interrupted run
+picks up where it stopped. A summary report is printed and written as JSON.
+
+Usage:
+    python narrate_listings.py listings.csv --workers 4
+    python narrate_listings.py listings.jsonl --video --workers 2
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from app.tts_cache import make_cache_key
+
+DEFAULT_OUTPUT_DIR = "static/narrations"
+DEFAULT_SPEED = 1.3  # Same speed as the API narration
+CHECKPOINT_FILE = "progress.jsonl"
+REPORT_FILE = "report.json"
+
+
+# === Manifest ===
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+    """Load listings from a CSV (with header) or JSONL manifest."""
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        return rows
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def read_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """Latest checkpoint record per listing id."""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Truncated last line from an interrupted run
+            records[record["id"]] = record
+    return records
+
+
+# === Worker process ===
+
+def _init_worker(engine_name: str, video: bool, threads: int) -> None:
+    """Load the models once per worker process."""
+    # One model instance per process; the processes are the parallelism
+    os.environ["TTS_POOL_SIZE"] = "1"
+    from tts.engines import get_tts_engine
+    get_tts_engine(engine_name).warm_up()
+    if video:
+        from avatar.lipsync_worker import get_lipsync_worker
+        get_lipsync_worker()
+    if "torch" in sys.modules:
+        # Share the cores between the worker processes
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def _render(item: Dict[str, Any], engine_name: str) -> Dict[str, Any]:
+    """Synthesize one listing (and its video); runs in a worker process."""
+    from tts.engines import get_tts_engine
+    timings: Dict[str, float] = {}
+
+    if not os.path.exists(item["audio_path"]):
+        start = time.perf_counter()
+        tmp_path = _tmp_path(item["audio_path"])
+        try:
+            get_tts_engine(engine_name).synthesize(
+                item["text"], tmp_path,
+                language=item["language"], voice=item["voice"], speed=item["speed"],
+            )
+            os.replace(tmp_path, item["audio_path"])
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        timings["tts"] = round(time.perf_counter() - start, 4)
+
+    if item.get("video_path") and not os.path.exists(item["video_path"]):
+        from avatar.lipsync_worker import get_lipsync_worker
+        start = time.perf_counter()
+        tmp_path = _tmp_path(item["video_path"])
+        workdir = os.path.join(os.path.dirname(item["video_path"]), f".work_{os.getpid()}")
+        try:
+            get_lipsync_worker().generate(
+                item["face"], item["audio_path"], tmp_path, workdir=workdir, timings=timings
+            )
+            os.replace(tmp_path, item["video_path"])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        timings["lipsync"] = round(time.perf_counter() - start, 4)
+
+    return timings
+
+
+def _tmp_path(path: str) -> str:
+    """Partial outputs get a dot-prefixed name, so they never look finished."""
+    directory, filename = os.path.split(path)
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(directory, f".{stem}.{os.getpid()}.tmp{ext}")
+
+
+# === Planning ===
+
+def plan_items(rows: List[Dict[str, Any]], args, extension: str) -> List[Dict[str, Any]]:
+    """Turn manifest rows into render items with content-addressed output paths."""
+    items = []
+    for n, row in enumerate(rows):
+        text = (row.get("text") or "").strip()
+        language = row.get("language") or args.language
+        voice = row.get("voice") or None
+        key = make_cache_key(text, language, voice, speed=args.speed, engine=args.engine, extension=extension)
+        item = {
+            "id": str(row.get("id") or f"row{n}"),
+            "text": text,
+            "language": language,
+            "voice": voice,
+            "speed": args.speed,
+            "audio_path": os.path.join(args.output_dir, "audio", f"{key}.{extension}"),
+            "video_path": None,
+            "error": None if text else "Empty text",
+        }
+        if args.video and text:
+            from app.avatar_jobs import resolve_avatar_face
+            avatar_id = row.get("avatar_id") or args.avatar
+            try:
+                item["face"] = os.path.abspath(resolve_avatar_face(avatar_id))
+                item["video_path"] = os.path.join(
+                    args.output_dir, "video", f"{key[:32]}_{avatar_id}.mp4"
+                )
+            except (ValueError, FileNotFoundError) as e:
+                item["error"] = str(e)
+        items.append(item)
+    return items
+
+
+def _outputs_exist(item: Dict[str, Any]) -> bool:
+    return os.path.exists(item["audio_path"]) and (
+        not item["video_path"] or os.path.exists(item["video_path"])
+    )
+
+
+# === Main ===
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render narration for a manifest of listings")
+    parser.add_argument("manifest", help="CSV (with header) or JSONL file: id, text, [language], [voice], [avatar_id]")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where audio, video, checkpoint and report go")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes (each loads its own models)")
+    parser.add_argument("--engine", default=os.getenv("TTS_ENGINE", "gtts"), help="TTS engine (gtts, coqui)")
+    parser.add_argument("--language", default="en", help="Default language for rows without one")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED, help="Speech speed")
+    parser.add_argument("--video", action="store_true", help="Also render a Wav2Lip video per listing")
+    parser.add_argument("--avatar", default="default", help="Default avatar for rows without avatar_id")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of a previous run")
+    args = parser.parse_args(argv)
+
+    from tts.engines import ENGINES
+    if args.engine not in ENGINES:
+        parser.error(f"Unknown TTS engine '{args.engine}'. Available: {', '.join(ENGINES)}")
+
+    os.makedirs(os.path.join(args.output_dir, "audio"), exist_ok=True)
+    if args.video:
+        os.makedirs(os.path.join(args.output_dir, "video"), exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, CHECKPOINT_FILE)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    items = plan_items(read_manifest(args.manifest), args, ENGINES[args.engine].extension)
+    previous = read_checkpoint(checkpoint_path)
+
+    counts = {"rendered": 0, "cached": 0, "resumed": 0, "failed": 0}
+    stage_totals: Dict[str, float] = {}
+    failures: List[Dict[str, str]] = []
+    started = time.time()
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        def record(item: Dict[str, Any], status: str, timings: Optional[Dict[str, float]] = None,
+                   error: Optional[str] = None) -> None:
+            counts[status] += 1
+            for stage, seconds in (timings or {}).items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+            if error:
+                failures.append({"id": item["id"], "error": error})
+                print(f"[FAILED] {item['id']}: {error}")
+            if status != "resumed":
+                checkpoint.write(json.dumps({
+                    "id": item["id"],
+                    "status": "failed" if error else "done",
+                    "audio_path": item["audio_path"],
+                    "video_path": item["video_path"],
+                    "timings": timings or {},
+                    "error": error,
+                    "finished_at": time.time(),
+                }) + "\n")
+                checkpoint.flush()
+
+        pending = []
+        for item in items:
+            if item["error"]:
+                record(item, "failed", error=item["error"])
+            elif _outputs_exist(item):
+                done_before = previous.get(item["id"], {}).get("status") == "done"
+                record(item, "resumed" if done_before else "cached")
+            else:
+                pending.append(item)
+
+        print(f"{len(items)} listings: {len(pending)} to render, "
+              f"{counts['cached'] + counts['resumed']} already done, {counts['failed']} invalid")
+
+        if pending:
+            workers = max(1, min(args.workers, len(pending)))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # spawn: torch does not survive a fork once initialized
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(args.engine, args.video, threads),
+            ) as pool:
+                futures = {pool.submit(_render, item, args.engine): item for item in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    item = futures[future]
+                    try:
+                        record(item, "rendered", timings=future.result())
+                        print(f"[{done}/{len(pending)}] {item['id']} -> {item['video_path'] or item['audio_path']}")
+                    except Exception as e:
+                        record(item, "failed", error=str(e))
+
+    elapsed = time.time() - started
+    report = {
+        "manifest": os.path.abspath(args.manifest),
+        "total": len(items),
+        **counts,
+        "elapsed_seconds": round(elapsed, 2),
+        "stage_seconds": {stage: round(seconds, 2) for stage, seconds in stage_totals.items()},
+        "failures": failures,
+    }
+    with open(os.path.join(args.output_dir, REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== Narration summary ===")
+    print(f"Listings: {len(items)}")
+    print(f"Rendered: {counts['rendered']}  Cached: {counts['cached']}  "
+          f"Resumed: {counts['resumed']}  Failed: {counts['failed']}")
+    if counts["rendered"]:
+        for stage, seconds in sorted(stage_totals.items()):
+            print(f"  {stage}: {seconds / counts['rendered']:.2f}s per listing")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"Report: {os.path.join(args.output_dir, REPORT_FILE)}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
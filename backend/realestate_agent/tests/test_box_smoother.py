@@ -0,0 +1,61 @@
+"""
+Streaming face box smoothing must match the whole-video smoothing it replaced.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+for module in ("torch", "cv2", "scipy", "librosa", "tqdm"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Wav2Lip"))
+
+from inference import BoxSmoother
+
+
+def reference_smoothened_boxes(boxes, T):
+    """Original in-place get_smoothened_boxes, run on the whole video."""
+    for i in range(len(boxes)):
+        if i + T > len(boxes):
+            window = boxes[len(boxes) - T:]
+        else:
+            window = boxes[i : i + T]
+        boxes[i] = np.mean(window, axis=0)
+    return boxes
+
+
+def stream(boxes, T):
+    smoother = BoxSmoother(T)
+    released = []
+    for n, box in enumerate(boxes, 1):
+        released.extend(smoother.push(box))
+        # Never holds back more than the window
+        assert len(smoother.pending) == n - len(released) < T
+    released.extend(smoother.flush())
+    return np.array(released)
+
+
+@pytest.mark.parametrize("T", [1, 3, 5])
+@pytest.mark.parametrize("num_frames", [1, 2, 4, 5, 6, 12, 37])
+def test_matches_whole_video_smoothing(T, num_frames):
+    rng = np.random.default_rng(num_frames * 10 + T)
+    boxes = [tuple(int(v) for v in row) for row in rng.integers(0, 720, size=(num_frames, 4))]
+    expected = reference_smoothened_boxes(np.array(boxes), T)
+    actual = stream(boxes, T)
+    assert actual.dtype == expected.dtype
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_float_boxes():
+    rng = np.random.default_rng(0)
+    boxes = rng.uniform(0, 720, size=(23, 4))
+    np.testing.assert_allclose(stream(list(boxes), 5), reference_smoothened_boxes(boxes.copy(), 5))
+
+
+def test_releases_box_once_window_is_full():
+    smoother = BoxSmoother(T=3)
+    assert smoother.push((0, 0, 10, 10)) == []
+    assert smoother.push((0, 0, 10, 10)) == []
+    assert len(smoother.push((0, 0, 10, 10))) == 1
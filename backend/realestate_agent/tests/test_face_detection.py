@@ -0,0 +1,100 @@
+"""
+The vectorized s3fd decoding and batched NMS must find the same faces as
+the original per-anchor loop followed by per-image ``nms``.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("scipy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Wav2Lip"))
+
+import torch.nn.functional as F
+from face_detection.detection.sfd import bbox, detect
+
+
+def reference_batch_detect(olist):
+    """Decoding loop of the original ``batch_detect``, after the softmax."""
+    BB = olist[0].size(0)
+    bboxlist = []
+    for i in range(len(olist) // 2):
+        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
+        stride = 2**(i + 2)
+        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
+        for Iindex, hindex, windex in poss:
+            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
+            score = ocls[:, 1, hindex, windex]
+            loc = oreg[:, :, hindex, windex].contiguous().view(BB, 1, 4)
+            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]]).view(1, 1, 4)
+            box = bbox.batch_decode(loc, priors, [0.1, 0.2])[:, 0]
+            bboxlist.append(torch.cat([box, score.unsqueeze(1)], 1).cpu().numpy())
+    bboxlist = np.array(bboxlist)
+    if 0 == len(bboxlist):
+        bboxlist = np.zeros((1, BB, 5))
+    return bboxlist
+
+
+def reference_nms(bboxlists):
+    """Per-image NMS and score filter of the original ``detect_from_batch``."""
+    results = []
+    for i in range(bboxlists.shape[1]):
+        keep = bbox.nms(bboxlists[:, i, :], 0.3)
+        results.append(np.array([x for x in bboxlists[keep, i, :] if x[-1] > 0.5]).reshape(-1, 5))
+    return results
+
+
+def fake_outputs(seed, batch_size=3, size=64, density=0.05):
+    """Random softmaxed s3fd outputs with a few confident anchors per level."""
+    gen = torch.Generator().manual_seed(seed)
+    olist = []
+    for i in range(6):
+        H = W = max(1, size >> i)
+        cls = F.softmax(torch.randn(batch_size, 2, H, W, generator=gen) * 2, dim=1)
+        cls[:, 1] *= torch.rand(batch_size, H, W, generator=gen) < density
+        reg = torch.randn(batch_size, 4, H, W, generator=gen)
+        olist += [cls, reg]
+    return olist
+
+
+def assert_same_faces(expected, actual):
+    assert len(expected) == len(actual)
+    for a, b in zip(expected, actual):
+        assert a.shape == b.shape
+        # Saturated float32 scores tie, and tied boxes may come in either order
+        a, b = a[np.lexsort(a.T[::-1])], b[np.lexsort(b.T[::-1])]
+        np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-4)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_decode_matches_reference(seed):
+    olist = fake_outputs(seed)
+    decoded = detect.decode_detections(olist).permute(1, 0, 2).numpy()
+    # The loop decodes an anchor once per image above the threshold, so only
+    # the faces surviving NMS are comparable, not the raw candidate lists
+    assert_same_faces(reference_nms(reference_batch_detect(olist)), reference_nms(decoded))
+
+
+def test_decode_without_candidates():
+    olist = fake_outputs(0, density=0.0)
+    assert detect.decode_detections(olist).shape == (3, 0, 5)
+
+
+@pytest.mark.parametrize("use_torchvision", [True, False])
+@pytest.mark.parametrize("seed", range(10))
+def test_batch_nms_matches_reference(seed, use_torchvision, monkeypatch):
+    if use_torchvision and bbox._batched_nms is None:
+        pytest.skip("torchvision is not installed")
+    if not use_torchvision:
+        monkeypatch.setattr(bbox, "_batched_nms", None)
+    bboxlists = detect.decode_detections(fake_outputs(seed, density=0.2)).permute(1, 0, 2).numpy()
+    assert_same_faces(reference_nms(bboxlists), bbox.batch_nms(bboxlists, 0.3))
+
+
+def test_batch_nms_without_faces():
+    bboxlists = np.zeros((1, 4, 5))
+    assert [b.shape for b in bbox.batch_nms(bboxlists, 0.3)] == [(0, 5)] * 4
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app import llm_cache as llm_cache_module
+from app.llm_cache import (
+    LLMResponseCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    create_backend,
+    make_cache_key,
+)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryCacheBackend(**kwargs)
+        return SQLiteCacheBackend(path=str(tmp_path / "llm_cache.sqlite3"), **kwargs)
+    return make
+
+
+def test_key_ignores_trivial_prompt_differences():
+    key = make_cache_key("What is the price?", None, "gpt-3.5-turbo", 0.0, 200)
+    assert key == make_cache_key("  what is the   PRICE ", "", "gpt-3.5-turbo", 0.0, 200)
+    assert key != make_cache_key("What is the price?", "Be brief", "gpt-3.5-turbo", 0.0, 200)
+    assert key != make_cache_key("What is the price?", None, "gpt-4", 0.0, 200)
+    assert key != make_cache_key("What is the price?", None, "gpt-3.5-turbo", 0.0, 100)
+
+
+def test_hit_and_miss(make_backend, clock):
+    backend = make_backend(ttl=60, max_entries=10)
+    assert backend.get("k1") is None
+    backend.set("k1", {"text": "Hello"})
+    assert backend.get("k1") == ({"text": "Hello"}, clock.now)
+    assert len(backend) == 1
+
+
+def test_entries_expire_after_ttl(make_backend, clock):
+    backend = make_backend(ttl=60, max_entries=10)
+    backend.set("k1", {"text": "Hello"})
+    clock.now += 59
+    assert backend.get("k1") is not None
+    clock.now += 2
+    assert backend.get("k1") is None
+    assert len(backend) == 0
+
+
+def test_least_recently_used_is_evicted(make_backend, clock):
+    backend = make_backend(ttl=60, max_entries=2)
+    backend.set("k1", {"n": 1})
+    clock.now += 1
+    backend.set("k2", {"n": 2})
+    clock.now += 1
+    backend.get("k1")  # k2 is now the least recently used
+    clock.now += 1
+    backend.set("k3", {"n": 3})
+    assert backend.get("k2") is None
+    assert backend.get("k1") is not None
+    assert backend.get("k3") is not None
+
+
+def test_sqlite_cache_is_shared_and_persistent(tmp_path, clock):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    SQLiteCacheBackend(path=path, ttl=60).set("k1", {"text": "Hello"})
+    assert SQLiteCacheBackend(path=path, ttl=60).get("k1") == ({"text": "Hello"}, clock.now)
+
+
+def test_response_cache_counts_hits_and_age(clock):
+    cache = LLMResponseCache(MemoryCacheBackend(ttl=60), max_temperature=0.0)
+
+    async def scenario():
+        assert await cache.get("k1") is None
+        await cache.set("k1", {"text": "Hello"})
+        clock.now += 5
+        return await cache.get("k1")
+
+    assert asyncio.run(scenario()) == ({"text": "Hello"}, 5.0)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_only_deterministic_requests_are_cacheable():
+    cache = LLMResponseCache(MemoryCacheBackend(), max_temperature=0.0)
+    assert cache.is_cacheable(0.0)
+    assert not cache.is_cacheable(0.7)
+    assert not LLMResponseCache(None).is_cacheable(0.0)
+
+
+def test_backend_lookup_errors_count_as_misses():
+    class BrokenBackend(MemoryCacheBackend):
+        def get(self, key):
+            raise OSError("disk gone")
+
+    cache = LLMResponseCache(BrokenBackend())
+    assert asyncio.run(cache.get("k1")) is None
+    assert cache.misses == 1
+
+
+def test_create_backend():
+    assert isinstance(create_backend("memory"), MemoryCacheBackend)
+    assert create_backend("none") is None
+    assert create_backend("bogus") is None
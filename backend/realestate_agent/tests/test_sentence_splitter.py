@@ -0,0 +1,47 @@
+import pytest
+
+for module in ("openai", "httpx", "fastapi", "pydantic", "dotenv"):
+    pytest.importorskip(module)
+
+from app.agent_pipeline import SentenceSplitter
+
+
+def split(text, chunk_size=None):
+    """Feed ``text`` in chunks of ``chunk_size`` characters (all at once if None)."""
+    splitter = SentenceSplitter()
+    size = chunk_size or len(text)
+    sentences = []
+    for i in range(0, len(text), size):
+        sentences.extend(splitter.feed(text[i:i + size]))
+    rest = splitter.flush()
+    return sentences + ([rest] if rest else [])
+
+
+def test_exclamation_ends_short_sentence_char_by_char():
+    text = "Price is $500k! Want to visit Dr. Smith?"
+    assert split(text, chunk_size=1) == ["Price is $500k!", "Want to visit Dr. Smith?"]
+
+
+def test_question_mark_ends_short_sentence():
+    assert split("Interested? The house has a pool. ", chunk_size=1) == [
+        "Interested?", "The house has a pool.",
+    ]
+
+
+def test_abbreviation_does_not_end_sentence():
+    assert split("The flat is approx. 80 sq. ft. bigger than the last one. ") == [
+        "The flat is approx. 80 sq. ft. bigger than the last one.",
+    ]
+
+
+def test_short_period_sentence_is_merged():
+    assert split("Sure. The apartment is on the third floor. ") == [
+        "Sure. The apartment is on the third floor.",
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_chunking_does_not_change_sentences(chunk_size):
+    text = ("Great news! The villa at 12 St. James Rd. costs $1.2m. "
+            "It has 4 bedrooms.\nWould you like a tour? I can book one for Monday.")
+    assert split(text, chunk_size=chunk_size) == split(text)
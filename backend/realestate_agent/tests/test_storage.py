@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+from app.storage import MIN_FILE_AGE, TMP_FILE_MAX_AGE, StorageArea, StorageManager
+
+HOUR = 3600
+
+
+@pytest.fixture
+def area(tmp_path):
+    return StorageArea("audio", str(tmp_path / "audio"), quota_bytes=1000, ttl_seconds=24 * HOUR)
+
+
+@pytest.fixture
+def manager(area):
+    manager = StorageManager([area])
+    manager.scan()
+    return manager
+
+
+def write(area, name, size=100, age=2 * MIN_FILE_AGE):
+    """Create a file in ``area`` that was last modified ``age`` seconds ago."""
+    path = os.path.join(area.directory, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def remaining(area):
+    return sorted(os.listdir(area.directory))
+
+
+def test_expired_files_are_deleted(manager, area):
+    write(area, "old.wav", age=25 * HOUR)
+    write(area, "new.wav", age=HOUR)
+    manager.scan()
+    assert manager.collect() == 1
+    assert remaining(area) == ["new.wav"]
+    assert manager.deleted_bytes == 100
+
+
+def test_oldest_files_go_first_when_over_quota(manager, area):
+    for n in range(5):
+        write(area, f"{n}.wav", size=300, age=(10 - n) * MIN_FILE_AGE)
+    manager.scan()
+    assert manager.collect() == 2
+    assert remaining(area) == ["2.wav", "3.wav", "4.wav"]
+    assert area.used_bytes == 900
+
+
+def test_recent_files_are_kept_over_quota(manager, area):
+    write(area, "a.wav", size=600, age=1)
+    write(area, "b.wav", size=600, age=1)
+    manager.scan()
+    assert manager.collect() == 0
+    assert remaining(area) == ["a.wav", "b.wav"]
+
+
+def test_pinned_files_are_kept(manager, area):
+    path = write(area, "playing.wav", age=25 * HOUR)
+    manager.scan()
+    manager.pin(path)
+    manager.pin(path)
+    manager.unpin(path)
+    assert manager.collect() == 0
+    manager.unpin(path)
+    assert manager.collect() == 1
+    assert remaining(area) == []
+
+
+def test_files_owned_by_a_cache_are_kept(manager, area):
+    write(area, "tts_abc.wav", age=25 * HOUR)
+    write(area, "reply.wav", age=25 * HOUR)
+    manager.add_owner(lambda path: os.path.basename(path).startswith("tts_"))
+    manager.scan()
+    assert manager.collect() == 1
+    assert remaining(area) == ["tts_abc.wav"]
+
+
+def test_orphaned_temp_files_are_collected(manager, area):
+    write(area, ".orphan.tmp.wav", age=TMP_FILE_MAX_AGE + MIN_FILE_AGE)
+    write(area, ".writing.tmp.wav", age=2 * MIN_FILE_AGE)
+    write(area, "reply.wav", age=TMP_FILE_MAX_AGE + MIN_FILE_AGE)
+    manager.scan()
+    assert manager.collect() == 1
+    assert remaining(area) == [".writing.tmp.wav", "reply.wav"]
+
+
+def test_registered_files_are_indexed(manager, area):
+    path = write(area, "reply.wav", size=123)
+    manager.register(path)
+    manager.register(os.path.join(os.path.dirname(area.directory), "elsewhere.wav"))
+    assert area.files["reply.wav"][0] == 123
+    assert manager.stats()["areas"]["audio"]["bytes"] == 123
@@ -0,0 +1,190 @@
+import os
+import asyncio
+
+import pytest
+
+from app import tts_cache as tts_cache_module
+from app.storage import StorageManager
+from app.tts_cache import TTSCache, make_cache_key
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """A private storage manager, so pins do not leak between tests."""
+    manager = StorageManager([])
+    monkeypatch.setattr(tts_cache_module, "storage_manager", manager)
+    return manager
+
+
+@pytest.fixture
+def cache(tmp_path, storage):
+    return TTSCache(
+        directory=str(tmp_path / "audio"),
+        index_path=str(tmp_path / "index.json"),
+        max_bytes=1024 * 1024,
+        max_entries=10,
+        enabled=True,
+    )
+
+
+class FakeEngine:
+    """Writes ``size`` bytes to the requested path, optionally after a delay."""
+
+    def __init__(self, size=100, delay=0.0, fail=False):
+        self.size = size
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, path):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        with open(path, "wb") as f:
+            f.write(b"\0" * self.size)
+        return path
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_cache_key_covers_audio_parameters():
+    key = make_cache_key("Hello  there ", "en")
+    assert key == make_cache_key("Hello there", "en")
+    assert key != make_cache_key("Hello there", "ar")
+    assert key != make_cache_key("Hello there", "en", speed=1.3)
+    assert key != make_cache_key("Hello there", "en", engine="coqui")
+    assert key != make_cache_key("Hello there", "en", extension="mp3")
+
+
+def test_miss_then_hit(cache):
+    engine = FakeEngine()
+
+    async def scenario():
+        first = await cache.get_or_create("k1", engine)
+        second = await cache.get_or_create("k1", engine)
+        return first, second
+
+    (path, hit), (path_again, hit_again) = run(scenario())
+    assert (hit, hit_again) == (False, True)
+    assert path == path_again == os.path.join(cache.directory, "tts_k1.wav")
+    assert os.path.getsize(path) == 100
+    assert engine.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_concurrent_misses_share_one_synthesis(cache):
+    engine = FakeEngine(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_create("k1", engine) for _ in range(3)))
+
+    results = run(scenario())
+    assert engine.calls == 1
+    assert len({path for path, _ in results}) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True]
+
+
+def test_cancelled_first_caller_still_fills_cache(cache):
+    engine = FakeEngine(delay=0.05)
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_create("k1", engine))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_create("k1", engine))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    path, hit = run(scenario())
+    assert hit and os.path.exists(path)
+    assert engine.calls == 1
+    assert cache.get("k1") == path
+
+
+def test_failed_synthesis_is_not_cached(cache):
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_create("k1", FakeEngine(fail=True))
+        return await cache.get_or_create("k1", FakeEngine())
+
+    path, hit = run(scenario())
+    assert not hit and os.path.exists(path)
+    # No partial temp files left behind
+    assert os.listdir(cache.directory) == ["tts_k1.wav"]
+
+
+def test_file_deleted_behind_cache_is_a_miss(cache):
+    engine = FakeEngine()
+
+    async def scenario():
+        path, _ = await cache.get_or_create("k1", engine)
+        os.remove(path)
+        return await cache.get_or_create("k1", engine)
+
+    path, hit = run(scenario())
+    assert not hit and os.path.exists(path)
+    assert engine.calls == 2
+
+
+def test_evicts_least_recently_used(cache):
+    cache.max_entries = 2
+
+    async def scenario():
+        await cache.get_or_create("k1", FakeEngine())
+        await cache.get_or_create("k2", FakeEngine())
+        cache.get("k1")  # k2 is now the least recently used
+        await cache.get_or_create("k3", FakeEngine())
+
+    run(scenario())
+    assert list(cache.entries) == ["k1", "k3"]
+    assert not os.path.exists(os.path.join(cache.directory, "tts_k2.wav"))
+    assert cache.evictions == 1
+
+
+def test_evicts_by_size(cache):
+    cache.max_bytes = 250
+
+    async def scenario():
+        for key in ("k1", "k2", "k3"):
+            await cache.get_or_create(key, FakeEngine(size=100))
+
+    run(scenario())
+    assert list(cache.entries) == ["k2", "k3"]
+    assert cache.total_bytes == 200
+
+
+def test_pinned_clips_are_not_evicted(cache, storage):
+    cache.max_entries = 1
+
+    async def scenario():
+        path, _ = await cache.get_or_create("k1", FakeEngine())
+        storage.pin(path)
+        await cache.get_or_create("k2", FakeEngine())
+        return path
+
+    pinned = run(scenario())
+    # Over budget rather than deleting the pinned clip or the one just added
+    assert list(cache.entries) == ["k1", "k2"]
+    assert os.path.exists(pinned)
+
+    storage.unpin(pinned)
+    run(cache.get_or_create("k3", FakeEngine()))
+    assert list(cache.entries) == ["k3"]
+
+
+def test_index_survives_restart(cache):
+    async def scenario():
+        await cache.get_or_create("k1", FakeEngine())
+        await cache.get_or_create("k2", FakeEngine())
+        cache.get("k1")
+
+    run(scenario())
+    cache.save_index()
+
+    reloaded = TTSCache(directory=cache.directory, index_path=cache.index_path, enabled=True)
+    assert list(reloaded.entries) == ["k2", "k1"]
+    assert reloaded.total_bytes == 200
+    assert reloaded.owns(os.path.join(cache.directory, "tts_k1.wav"))
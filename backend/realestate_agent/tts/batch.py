@@ -0,0 +1,52 @@
+"""
+Synthesize every non-empty line of a text file in one process.
+
+The engine (and, for the local engine, its model pool) is loaded once and
+the lines are synthesized concurrently, instead of starting a new `tts`
+process and reloading the model for every line.
+
+Usage:
+    python -m tts.batch input.txt --out-pattern "input_{n}.{ext}" --engine coqui
+"""
+import os
+import sys
+import argparse
+import logging
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts.engines import get_tts_engine, TTS_ENGINE
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch text-to-speech, one audio file per line")
+    parser.add_argument("input", help="Text file with one sentence per line")
+    parser.add_argument("--out-pattern", default="input_{n}.{ext}",
+                        help="Output path pattern; {n} is the index of the non-empty line, "
+                             "{ext} the engine's file extension (wav, mp3)")
+    parser.add_argument("--engine", default=TTS_ENGINE, help="TTS engine (gtts, coqui)")
+    parser.add_argument("--language", default="en", help="Language code")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.input, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if not lines:
+        print("No text to synthesize")
+        return 0
+
+    engine = get_tts_engine(args.engine)
+    engine.warm_up()
+    items = [(line, args.out_pattern.format(n=n, ext=engine.extension)) for n, line in enumerate(lines)]
+    for path in {os.path.dirname(p) for _, p in items if os.path.dirname(p)}:
+        os.makedirs(path, exist_ok=True)
+
+    paths = engine.synthesize_batch(items, language=args.language)
+    for (line, _), path in zip(items, paths):
+        print(f"Generated {path} for: {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
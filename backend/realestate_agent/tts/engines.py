@@ -0,0 +1,217 @@
+"""
+Pluggable TTS engines.
+
+``gtts`` calls Google's service (one network round trip per request).
+``coqui`` runs a Coqui TTS model (glow-tts by default) in-process and keeps
+a pool of warm model instances, so requests pay neither a network round trip
+nor a model load. Pick the engine with the TTS_ENGINE environment variable.
+"""
+import os
+import queue
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")
+TTS_FALLBACK_ENGINE = os.getenv("TTS_FALLBACK_ENGINE", "gtts")
+COQUI_MODEL = os.getenv("COQUI_MODEL", "tts_models/en/ljspeech/glow-tts")
+COQUI_LANGUAGES = tuple(os.getenv("COQUI_LANGUAGES", "en").split(","))
+# More instances than concurrent TTS calls (TTS_WORKERS in app.tts_executor) would never be used
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", "0")) or min(
+    os.cpu_count() or 1, int(os.getenv("TTS_WORKERS", "4"))
+)
+
+
+class TTSEngine(ABC):
+    """A speech synthesizer that writes one utterance to an audio file."""
+
+    name: str = ""
+    extension: str = "wav"
+    languages: Optional[Tuple[str, ...]] = None   # None: any language
+    batch_workers: int = 4                         # Concurrent requests in synthesize_batch
+
+    def supports_language(self, language: str) -> bool:
+        return self.languages is None or language in self.languages
+
+    @abstractmethod
+    def synthesize(
+        self,
+        text: str,
+        output_path: str,
+        language: str = "en",
+        voice: Optional[str] = None,
+        speed: float = 1.0
+    ) -> str:
+        """
+        Synthesize text into output_path (blocking).
+
+        Returns:
+            Path to the generated audio file
+        """
+
+    def synthesize_batch(
+        self,
+        items: List[Tuple[str, str]],
+        language: str = "en",
+        voice: Optional[str] = None,
+        speed: float = 1.0
+    ) -> List[str]:
+        """
+        Synthesize many (text, output_path) pairs concurrently (blocking).
+
+        Returns:
+            Paths of the generated files, in input order
+        """
+        def run(item: Tuple[str, str]) -> str:
+            return self.synthesize(item[0], item[1], language=language, voice=voice, speed=speed)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.batch_workers, len(items)))) as pool:
+            return list(pool.map(run, items))
+
+    def warm_up(self) -> None:
+        """Load whatever the engine needs before the first request."""
+
+    def close(self) -> None:
+        """Release models and other resources."""
+
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech over the network."""
+
+    name = "gtts"
+    extension = "mp3"   # gTTS always returns MP3 data
+
+    def synthesize(self, text, output_path, language="en", voice=None, speed=1.0):
+        from tts.tts_simple import generate_tts_audio
+        audio_path = generate_tts_audio(text=text, output_path=output_path, language=language, speed=speed)
+        if not audio_path:
+            raise RuntimeError("gTTS produced no audio")
+        return audio_path
+
+
+class CoquiTTSEngine(TTSEngine):
+    """
+    In-process Coqui TTS with a pool of warm model instances.
+
+    A model instance is not safe to share between threads, so each request
+    checks one out of the pool. Up to ``pool_size`` instances are created
+    (by default one per concurrent TTS call, at most one per CPU core).
+    """
+
+    name = "coqui"
+
+    def __init__(self, model_name: str = COQUI_MODEL, pool_size: int = TTS_POOL_SIZE):
+        self.model_name = model_name
+        self.pool_size = max(1, pool_size)
+        self.batch_workers = self.pool_size
+        self.languages = COQUI_LANGUAGES
+        self._idle: "queue.Queue" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import torch
+        from TTS.api import TTS
+        # The intra-op thread count is process-wide: cap it so that pool_size
+        # inferences running at once do not oversubscribe the cores
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.pool_size))
+        logger.info(f"Loading Coqui model {self.model_name} ({self._created + 1}/{self.pool_size})")
+        return TTS(model_name=self.model_name, progress_bar=False, gpu=False)
+
+    @contextmanager
+    def _checkout(self) -> Iterator[object]:
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    model = self._load()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                model = self._idle.get()
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def warm_up(self) -> None:
+        models = []
+        with self._lock:
+            missing = self.pool_size - self._created
+            self._created += missing
+        try:
+            for _ in range(missing):
+                models.append(self._load())
+        finally:
+            with self._lock:
+                self._created -= missing - len(models)
+            for model in models:
+                self._idle.put(model)
+        logger.info(f"Coqui TTS pool ready with {self._created} instances")
+
+    def synthesize(self, text, output_path, language="en", voice=None, speed=1.0):
+        with self._checkout() as model:
+            kwargs = {}
+            if voice and getattr(model, "is_multi_speaker", False):
+                kwargs["speaker"] = voice
+            model.tts_to_file(text=text, file_path=output_path, **kwargs)
+        return output_path
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+ENGINES = {
+    GTTSEngine.name: GTTSEngine,
+    CoquiTTSEngine.name: CoquiTTSEngine,
+}
+
+_engines: Dict[str, TTSEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_tts_engine(name: Optional[str] = None) -> TTSEngine:
+    """Return the process-wide instance of an engine (TTS_ENGINE by default)."""
+    name = (name or TTS_ENGINE).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine '{name}'. Available: {', '.join(ENGINES)}")
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = _engines[name] = ENGINES[name]()
+        return engine
+
+
+def get_engine_for_language(language: str) -> TTSEngine:
+    """The configured engine, or the fallback engine if it cannot speak the language."""
+    engine = get_tts_engine()
+    if engine.supports_language(language):
+        return engine
+    fallback = get_tts_engine(TTS_FALLBACK_ENGINE)
+    logger.info(f"TTS engine '{engine.name}' does not support '{language}', using '{fallback.name}'")
+    return fallback
+
+
+def close_engines() -> None:
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.close()
+        _engines.clear()
@@ -5,7 +5,6 @@ cd "$(dirname "$0")/realestate_agent" || exit 1
 
 # Create necessary directories
 mkdir -p static/audio
-mkdir -p audio_output
 
 # Install dependencies if needed
 pip install -r requirements.txt